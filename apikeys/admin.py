@@ -4,10 +4,31 @@
 
 from django.contrib import admin
 
-from .models import APIKey
+from .models import APIKey, APIKeyEndpointUsage
+
+
+class APIKeyEndpointUsageInline(admin.TabularInline):
+    model = APIKeyEndpointUsage
+    fields = ("endpoint", "requests", "last_used")
+    readonly_fields = ("endpoint", "requests", "last_used")
+    ordering = ("endpoint",)
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(APIKey)
 class APIKeyAdmin(admin.ModelAdmin):
-    list_display = ("uuid", "description", "enabled", "expires")
+    list_display = (
+        "uuid",
+        "description",
+        "enabled",
+        "expires",
+        "requests",
+        "last_used",
+    )
     list_display_links = ("uuid",)
+    readonly_fields = ("requests", "last_used")
+    inlines = [APIKeyEndpointUsageInline]
@@ -0,0 +1,133 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# In-memory map from a hash of a presented API key to the key and its
+# permissions, so that authenticating a request doesn't need to query them.
+#
+# Expiry is checked on every lookup. Any change to an API key or its
+# permissions bumps a shared version number (see hackdb.versions), which
+# empties the map in every process on its next lookup. Without a shared
+# cache the version is read from the database, once per request. As a
+# safety net the map is also emptied once it is older than
+# APIKEYS_CACHE_MAX_AGE seconds.
+
+import hashlib
+import threading
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from hackdb.versions import aget_version, bump_version, get_version
+
+from .models import APIKey, APIUser
+
+VERSION_KEY = "apikeys.keycache_version"
+CACHE_SIZE = 1024
+
+
+class ResolvedKey(NamedTuple):
+    apikey: APIKey
+    permissions: frozenset
+
+
+def key_hash(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def permission_names(apikey):
+    return apikey.permissions.values_list(
+        "content_type__app_label", "codename"
+    ).order_by()
+
+
+def load(key):
+    apikey = APIKey.objects.filter(key=key, enabled=True).first()
+    if apikey is None:
+        return None
+    return ResolvedKey(
+        apikey, frozenset(f"{ct}.{name}" for ct, name in permission_names(apikey))
+    )
+
+
+async def aload(key):
+    apikey = await APIKey.objects.filter(key=key, enabled=True).afirst()
+    if apikey is None:
+        return None
+    return ResolvedKey(
+        apikey,
+        frozenset([f"{ct}.{name}" async for ct, name in permission_names(apikey)]),
+    )
+
+
+def user_for(resolved):
+    if resolved is None:
+        return None
+    expires = resolved.apikey.expires
+    if expires is not None and expires <= timezone.now():
+        return None
+    return APIUser(resolved.apikey, resolved.permissions)
+
+
+class APIKeyCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.version = None
+        self.loaded = 0
+
+    def current(self, version):
+        # the map for this version, emptied if it is out of date
+        max_age = settings.APIKEYS_CACHE_MAX_AGE
+        if version != self.version or (
+            max_age and time.monotonic() - self.loaded > max_age
+        ):
+            with self.lock:
+                self.entries = {}
+                self.version = version
+                self.loaded = time.monotonic()
+        return self.entries
+
+    def store(self, entries, digest, resolved):
+        # unknown keys aren't remembered, so that a key is usable as soon as
+        # it is created and guessed keys can't push out the real ones
+        if resolved is None:
+            return
+        with self.lock:
+            if len(entries) >= CACHE_SIZE:
+                entries.clear()
+            entries[digest] = resolved
+
+    def resolve(self, key):
+        # an APIUser for the key, or None if it isn't active
+        entries = self.current(get_version(VERSION_KEY))
+        digest = key_hash(key)
+        try:
+            resolved = entries[digest]
+        except KeyError:
+            resolved = load(key)
+            self.store(entries, digest, resolved)
+        return user_for(resolved)
+
+    async def aresolve(self, key):
+        entries = self.current(await aget_version(VERSION_KEY))
+        digest = key_hash(key)
+        try:
+            resolved = entries[digest]
+        except KeyError:
+            resolved = await aload(key)
+            self.store(entries, digest, resolved)
+        return user_for(resolved)
+
+    def invalidate(self):
+        bump_version(VERSION_KEY)
+
+
+cache = APIKeyCache()
+
+
+def apikeys_changed():
+    transaction.on_commit(cache.invalidate)
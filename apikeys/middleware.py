@@ -3,52 +3,179 @@
 # SPDX-License-Identifier: MIT
 
 import base64
+import threading
 
-from django.db.models import Q
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
 from django.utils import timezone
 
-from .models import APIKey, APIUser
+from hackdb import metrics
+
+from . import keycache, ratelimit, usage
+
+
+def presented_keys(request):
+    # candidate keys in the order they should be tried
+    keys = []
+    if "HTTP_AUTHORIZATION" in request.META:
+        auth_type, credentials = request.META["HTTP_AUTHORIZATION"].split(" ", 1)
+        if auth_type.lower() == "bearer":
+            keys.append(credentials)
+        elif auth_type.lower() == "basic":
+            username, password = base64.b64decode(credentials).decode().split(":", 1)
+            keys.append(password)
+    if "X-API-Token" in request.headers:
+        keys.append(request.headers["X-API-Token"])
+    return keys
+
+
+RESOLVE_SECONDS = metrics.Histogram(
+    "apikeys_resolve_seconds", "Time spent resolving API keys per request"
+)
+
+REJECTED = metrics.Counter(
+    "apikeys_rejected",
+    "Requests refused by API key rate limits",
+    labels=("reason",),
+)
+
+
+def too_many_requests(rejected):
+    REJECTED.inc(reason=rejected.reason)
+    response = HttpResponse("Too many requests", status=429)
+    response["Retry-After"] = str(rejected.retry_after)
+    return response
+
+
+class StreamSlot:
+    # held by a streaming response until the response is closed, which the
+    # handler does whether the stream finished, failed or was never started
+
+    def __init__(self, limiter, key, limits):
+        self.limiter = limiter
+        self.key = key
+        self.limits = limits
+        self.lock = threading.Lock()
+        self.held = True
+
+    def release(self):
+        with self.lock:
+            held, self.held = self.held, False
+        if held:
+            self.limiter.release(self.key, self.limits)
+
+
+class SyncStream:
+    def __init__(self, content, slot):
+        self.content = content
+        self.close = slot.release
+
+    def __iter__(self):
+        return iter(self.content)
+
+
+class AsyncStream:
+    def __init__(self, content, slot):
+        self.content = content
+        self.close = slot.release
+
+    def __aiter__(self):
+        return aiter(self.content)
+
+
+def stream_limits_for(apikey):
+    # long-lived streams (event streams) would use up max_concurrent for as
+    # long as they are open, so they are counted separately
+    return f"{apikey.pk}.streams", ratelimit.Limits(0, 1, settings.APIKEYS_MAX_STREAMS)
+
+
+def hold_stream_slot(response, limiter, key, limits):
+    slot = StreamSlot(limiter, key, limits)
+    if response.is_async:
+        response.streaming_content = AsyncStream(response.streaming_content, slot)
+    else:
+        response.streaming_content = SyncStream(response.streaming_content, slot)
+
+
+def set_user(request, user):
+    async def auser():
+        return user
+
+    request.user = user
+    request.auser = auser
+    request._dont_enforce_csrf_checks = True
 
 
 class APIKeyMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        active_apikeys = APIKey.objects.filter(
-            Q(expires__isnull=True) | Q(expires__gt=timezone.now()),
-            enabled=True,
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user = None
+        with RESOLVE_SECONDS.time():
+            for key in presented_keys(request):
+                user = keycache.cache.resolve(key)
+                if user:
+                    set_user(request, user)
+                    break
+        if not user:
+            return self.get_response(request)
+
+        limiter = ratelimit.limiter()
+        limits = ratelimit.limits_for(user.apikey)
+        rejected = limiter.acquire(user.apikey.pk, limits)
+        if rejected:
+            return too_many_requests(rejected)
+        try:
+            response = self.get_response(request)
+        finally:
+            limiter.release(user.apikey.pk, limits)
+        if response.streaming:
+            stream_key, stream_limits = stream_limits_for(user.apikey)
+            rejected = limiter.acquire(stream_key, stream_limits)
+            if rejected:
+                return too_many_requests(rejected._replace(reason="streams"))
+            hold_stream_slot(response, limiter, stream_key, stream_limits)
+        usage.buffer.add(
+            usage.Use(user.apikey.pk, usage.endpoint_name(request), timezone.now())
         )
+        return response
+
+    async def __acall__(self, request):
+        user = None
+        with RESOLVE_SECONDS.time():
+            for key in presented_keys(request):
+                user = await keycache.cache.aresolve(key)
+                if user:
+                    set_user(request, user)
+                    break
+        if not user:
+            return await self.get_response(request)
 
-        if "HTTP_AUTHORIZATION" in request.META:
-            auth_type, credentials = request.META["HTTP_AUTHORIZATION"].split(" ", 1)
-            if auth_type.lower() == "bearer":
-                try:
-                    apikey = active_apikeys.get(key=credentials)
-                    request.user = APIUser(apikey)
-                    request._dont_enforce_csrf_checks = True
-                    return self.get_response(request)
-                except APIKey.DoesNotExist:
-                    pass
-            elif auth_type.lower() == "basic":
-                username, password = (
-                    base64.b64decode(credentials).decode().split(":", 1)
-                )
-                try:
-                    apikey = active_apikeys.get(key=password)
-                    request.user = APIUser(apikey)
-                    request._dont_enforce_csrf_checks = True
-                    return self.get_response(request)
-                except APIKey.DoesNotExist:
-                    pass
-
-        if "X-API-Token" in request.headers:
-            try:
-                apikey = active_apikeys.get(key=request.headers["X-API-Token"])
-                request.user = APIUser(apikey)
-                request._dont_enforce_csrf_checks = True
-                return self.get_response(request)
-            except APIKey.DoesNotExist:
-                pass
-
-        return self.get_response(request)
+        limiter = ratelimit.limiter()
+        limits = ratelimit.limits_for(user.apikey)
+        rejected = await limiter.aacquire(user.apikey.pk, limits)
+        if rejected:
+            return too_many_requests(rejected)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await limiter.arelease(user.apikey.pk, limits)
+        if response.streaming:
+            stream_key, stream_limits = stream_limits_for(user.apikey)
+            rejected = await limiter.aacquire(stream_key, stream_limits)
+            if rejected:
+                return too_many_requests(rejected._replace(reason="streams"))
+            hold_stream_slot(response, limiter, stream_key, stream_limits)
+        await usage.buffer.aadd(
+            usage.Use(user.apikey.pk, usage.endpoint_name(request), timezone.now())
+        )
+        return response
@@ -0,0 +1,54 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apikeys", "0005_auto_20240607_1423"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apikey",
+            name="last_used",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="apikey",
+            name="requests",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name="APIKeyEndpointUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("endpoint", models.CharField(editable=False, max_length=255)),
+                ("requests", models.PositiveBigIntegerField(default=0, editable=False)),
+                ("last_used", models.DateTimeField(editable=False)),
+                (
+                    "apikey",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="endpoint_usage",
+                        to="apikeys.apikey",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "API key endpoint usage",
+                "verbose_name_plural": "API key endpoint usage",
+                "unique_together": {("apikey", "endpoint")},
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("apikeys", "0006_apikey_usage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="apikey",
+            name="max_concurrent",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Requests in progress at the same time, 0 for no limit. Blank for the default.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="apikey",
+            name="rate_burst",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Requests allowed at once before the rate limit applies. Blank for the default.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="apikey",
+            name="rate_limit",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Requests per minute, 0 for no limit. Blank for the default.",
+                null=True,
+            ),
+        ),
+    ]
@@ -31,6 +31,25 @@ class APIKey(models.Model):
         Permission,
         blank=True,
     )
+    rate_limit = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Requests per minute, 0 for no limit. Blank for the default.",
+    )
+    rate_burst = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Requests allowed at once before the rate limit applies. "
+        "Blank for the default.",
+    )
+    max_concurrent = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Requests in progress at the same time, 0 for no limit. "
+        "Blank for the default.",
+    )
+    requests = models.PositiveBigIntegerField(default=0, editable=False)
+    last_used = models.DateTimeField(null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "API key"
@@ -39,6 +58,24 @@ class APIKey(models.Model):
         return str(self.uuid)
 
 
+class APIKeyEndpointUsage(models.Model):
+    # Requests per key and URL name, written by apikeys.usage.
+    apikey = models.ForeignKey(
+        APIKey, on_delete=models.CASCADE, related_name="endpoint_usage"
+    )
+    endpoint = models.CharField(max_length=255, editable=False)
+    requests = models.PositiveBigIntegerField(default=0, editable=False)
+    last_used = models.DateTimeField(editable=False)
+
+    class Meta:
+        verbose_name = "API key endpoint usage"
+        verbose_name_plural = "API key endpoint usage"
+        unique_together = ("apikey", "endpoint")
+
+    def __str__(self):
+        return self.endpoint
+
+
 class APIUser(AnonymousUser):
     _apikey = None
     _permissions = set()
@@ -46,12 +83,18 @@ class APIUser(AnonymousUser):
     def __str__(self):
         return f"APIUser #{self._apikey.uuid}"
 
-    def __init__(self, apikey):
+    def __init__(self, apikey, permissions=None):
         self._apikey = apikey
-        perms = apikey.permissions.values_list(
-            "content_type__app_label", "codename"
-        ).order_by()
-        setattr(self, "_permissions", {f"{ct}.{name}" for ct, name in perms})
+        if permissions is None:
+            perms = apikey.permissions.values_list(
+                "content_type__app_label", "codename"
+            ).order_by()
+            permissions = {f"{ct}.{name}" for ct, name in perms}
+        setattr(self, "_permissions", permissions)
+
+    @property
+    def apikey(self):
+        return self._apikey
 
     def get_user_permissions(self):
         return self._permissions
@@ -61,3 +104,12 @@ class APIUser(AnonymousUser):
 
     def has_perms(self, perm_list, obj=None):
         return all(self.has_perm(perm, obj) for perm in perm_list)
+
+    async def aget_user_permissions(self, obj=None):
+        return self.get_user_permissions()
+
+    async def ahas_perm(self, perm, obj=None):
+        return self.has_perm(perm, obj)
+
+    async def ahas_perms(self, perm_list, obj=None):
+        return self.has_perms(perm_list, obj)
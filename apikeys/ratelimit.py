@@ -0,0 +1,149 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Per-key request rate (token bucket) and in-flight request limits. State is
+# kept in memory per process unless APIKEYS_RATELIMIT_CACHE names a cache
+# alias, in which case counters are kept in that cache and shared between
+# every process using it.
+
+import math
+import threading
+import time
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+# seconds before a shared in-flight counter is dropped, so that requests
+# lost with a crashed worker don't hold their slot forever
+INFLIGHT_TIMEOUT = 300
+
+
+class Limits(NamedTuple):
+    rate: float  # requests per second, 0 for no limit
+    burst: int
+    concurrent: int  # 0 for no limit
+
+
+def limits_for(apikey):
+    def value(field, setting):
+        configured = getattr(apikey, field)
+        if configured is None:
+            return getattr(settings, setting)
+        return configured
+
+    rate = value("rate_limit", "APIKEYS_RATE_LIMIT") or 0
+    return Limits(
+        rate / 60,
+        max(value("rate_burst", "APIKEYS_RATE_BURST") or 1, 1),
+        value("max_concurrent", "APIKEYS_MAX_CONCURRENT") or 0,
+    )
+
+
+class Rejected(NamedTuple):
+    reason: str
+    retry_after: int
+
+
+class LocalLimiter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.inflight = {}
+
+    def acquire(self, key, limits):
+        # None if the request may go ahead, otherwise Rejected. Every
+        # successful acquire() must be followed by release().
+        now = time.monotonic()
+        with self.lock:
+            inflight = self.inflight.get(key, 0)
+            if limits.concurrent and inflight >= limits.concurrent:
+                return Rejected("concurrency", 1)
+            if limits.rate:
+                tokens, updated = self.buckets.get(key, (limits.burst, now))
+                tokens = min(limits.burst, tokens + (now - updated) * limits.rate)
+                if tokens < 1:
+                    self.buckets[key] = (tokens, now)
+                    return Rejected("rate", math.ceil((1 - tokens) / limits.rate))
+                self.buckets[key] = (tokens - 1, now)
+            self.inflight[key] = inflight + 1
+        return None
+
+    def release(self, key, limits):
+        with self.lock:
+            inflight = self.inflight.get(key, 0) - 1
+            if inflight > 0:
+                self.inflight[key] = inflight
+            else:
+                self.inflight.pop(key, None)
+
+    async def aacquire(self, key, limits):
+        # only touches memory
+        return self.acquire(key, limits)
+
+    async def arelease(self, key, limits):
+        self.release(key, limits)
+
+    def reset(self):
+        with self.lock:
+            self.buckets = {}
+            self.inflight = {}
+
+
+class SharedLimiter:
+    # The bucket is approximated by a fixed window: up to burst requests in
+    # each period of burst / rate seconds, counted with cache.incr().
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def increment(self, cache_key, timeout):
+        self.cache.add(cache_key, 0, timeout=timeout)
+        try:
+            return self.cache.incr(cache_key)
+        except ValueError:
+            # evicted between add() and incr()
+            self.cache.set(cache_key, 1, timeout=timeout)
+            return 1
+
+    def acquire(self, key, limits):
+        if limits.concurrent:
+            inflight_key = f"apikeys.inflight.{key}"
+            if self.increment(inflight_key, INFLIGHT_TIMEOUT) > limits.concurrent:
+                self.release(key, limits)
+                return Rejected("concurrency", 1)
+        if limits.rate:
+            window = limits.burst / limits.rate
+            now = time.time()
+            start = now - now % window
+            rate_key = f"apikeys.rate.{key}.{int(start / window)}"
+            if self.increment(rate_key, math.ceil(window) + 1) > limits.burst:
+                self.release(key, limits)
+                return Rejected("rate", max(math.ceil(start + window - now), 1))
+        return None
+
+    def release(self, key, limits):
+        if not limits.concurrent:
+            return
+        try:
+            self.cache.decr(f"apikeys.inflight.{key}")
+        except ValueError:
+            pass
+
+    async def aacquire(self, key, limits):
+        return await sync_to_async(self.acquire)(key, limits)
+
+    async def arelease(self, key, limits):
+        await sync_to_async(self.release)(key, limits)
+
+
+local = LocalLimiter()
+
+
+def limiter():
+    alias = settings.APIKEYS_RATELIMIT_CACHE
+    if alias is None:
+        return local
+    return SharedLimiter(caches[alias])
@@ -0,0 +1,21 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import keycache
+from .models import APIKey
+
+
+@receiver(post_save, sender=APIKey)
+@receiver(post_delete, sender=APIKey)
+def apikey_changed(sender, **kwargs):
+    keycache.apikeys_changed()
+
+
+@receiver(m2m_changed, sender=APIKey.permissions.through)
+def apikey_permissions_changed(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        keycache.apikeys_changed()
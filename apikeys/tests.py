@@ -0,0 +1,177 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import ratelimit
+from .keycache import cache
+from .models import APIKey
+
+
+class APIKeyCacheTestCase(TestCase):
+    def setUp(self):
+        self.apikey = APIKey.objects.create(description="door")
+        self.apikey.permissions.add(Permission.objects.get(codename="export_tokens"))
+
+    def test_resolve_single_query(self):
+        user = cache.resolve(self.apikey.key)
+        self.assertTrue(user.has_perm("nfctokens.export_tokens"))
+        self.assertIsNone(cache.resolve("unknown"))
+        # the version check, made once per request when run from a view
+        with self.assertNumQueries(1):
+            user = cache.resolve(self.apikey.key)
+            self.assertEqual(user.apikey.pk, self.apikey.pk)
+
+    def test_unknown_not_cached(self):
+        self.assertIsNone(cache.resolve("unknown"))
+        with self.assertNumQueries(2):
+            self.assertIsNone(cache.resolve("unknown"))
+        # created without running the version bump, empty the map afterwards
+        # so that no other test finds the key
+        self.addCleanup(cache.invalidate)
+        apikey = APIKey.objects.create(description="new", key="unknown")
+        self.assertEqual(cache.resolve("unknown").apikey.pk, apikey.pk)
+
+    def test_changes(self):
+        cache.resolve(self.apikey.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apikey.permissions.add(Permission.objects.get(codename="auth_token"))
+        self.assertTrue(cache.resolve(self.apikey.key).has_perm("nfctokens.auth_token"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apikey.enabled = False
+            self.apikey.save()
+        self.assertIsNone(cache.resolve(self.apikey.key))
+
+    def test_expiry(self):
+        self.apikey.expires = timezone.now() + datetime.timedelta(seconds=60)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apikey.save()
+        self.assertIsNotNone(cache.resolve(self.apikey.key))
+        cache.resolve(self.apikey.key).apikey.expires = timezone.now()
+        self.assertIsNone(cache.resolve(self.apikey.key))
+
+
+@override_settings(APIKEYS_USAGE_FLUSH_INTERVAL=0)
+class APIKeyUsageTestCase(TestCase):
+    def setUp(self):
+        self.apikey = APIKey.objects.create(description="door")
+        self.apikey.permissions.add(Permission.objects.get(codename="export_tokens"))
+
+    def get(self, path, key=None):
+        return self.client.get(
+            path, HTTP_AUTHORIZATION=f"Bearer {key or self.apikey.key}"
+        )
+
+    def test_usage(self):
+        self.get("/api/1/nfc_tokens")
+        self.get("/nfctokens/api/nfc_tokens_bundle")
+        self.get("/nfctokens/api/nfc_tokens_bundle")
+        self.get("/nfctokens/api/nfc_tokens_bundle", key="unknown")
+
+        self.apikey.refresh_from_db()
+        self.assertEqual(self.apikey.requests, 3)
+        self.assertIsNotNone(self.apikey.last_used)
+        self.assertEqual(
+            dict(self.apikey.endpoint_usage.values_list("endpoint", "requests")),
+            {
+                "nfctokens.views.nfc_tokens": 1,
+                "nfctokens_api_nfc_tokens_bundle": 2,
+            },
+        )
+
+
+@override_settings(APIKEYS_USAGE_FLUSH_INTERVAL=0)
+class APIKeyRateLimitTestCase(TestCase):
+    def setUp(self):
+        self.apikey = APIKey.objects.create(
+            description="door", rate_limit=6, rate_burst=2
+        )
+        self.apikey.permissions.add(Permission.objects.get(codename="export_tokens"))
+        self.addCleanup(ratelimit.local.reset)
+        self.addCleanup(caches["default"].clear)
+
+    def get(self):
+        return self.client.get(
+            "/nfctokens/api/nfc_tokens_bundle",
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+        )
+
+    def assert_rate_limited(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.assertEqual(self.get().status_code, 200)
+        response = self.get()
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 20)
+        self.apikey.refresh_from_db()
+        self.assertEqual(self.apikey.requests, 2)
+
+    def test_rate(self):
+        self.assert_rate_limited()
+
+    @override_settings(APIKEYS_RATELIMIT_CACHE="default")
+    def test_rate_shared(self):
+        self.assert_rate_limited()
+
+    def test_concurrency(self):
+        limits = ratelimit.Limits(0, 1, 2)
+        for limiter in [ratelimit.local, ratelimit.SharedLimiter(caches["default"])]:
+            with self.subTest(limiter=limiter):
+                self.assertIsNone(limiter.acquire(self.apikey.pk, limits))
+                self.assertIsNone(limiter.acquire(self.apikey.pk, limits))
+                self.assertEqual(
+                    limiter.acquire(self.apikey.pk, limits),
+                    ratelimit.Rejected("concurrency", 1),
+                )
+                limiter.release(self.apikey.pk, limits)
+                self.assertIsNone(limiter.acquire(self.apikey.pk, limits))
+
+    @override_settings(
+        NFCTOKENS_EVENTS_MAX_AGE=0,
+        NFCTOKENS_SIGHTING_FLUSH_INTERVAL=0,
+        APIKEYS_MAX_STREAMS=2,
+    )
+    def test_streams(self):
+        self.apikey.rate_limit = 0
+        self.apikey.max_concurrent = 1
+        self.apikey.save()
+        self.apikey.permissions.add(Permission.objects.get(codename="auth_token"))
+        headers = {"Authorization": f"Bearer {self.apikey.key}"}
+
+        def stream():
+            return async_to_sync(self.async_client.get)(
+                "/nfctokens/api/nfc_token_events", headers=headers
+            )
+
+        def read(response):
+            async def read():
+                return [chunk async for chunk in response.streaming_content]
+
+            return async_to_sync(read)()
+
+        streams = [stream(), stream()]
+        self.assertEqual([response.status_code for response in streams], [200, 200])
+        # open streams don't use up max_concurrent
+        response = self.client.post(
+            "/api/1/nfc_token_auth",
+            {"uid": "01234567"},
+            content_type="application/json",
+            headers=headers,
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(stream().status_code, 429)
+
+        # closed without being read, as when the client goes away early
+        streams[0].close()
+        streams[0] = stream()
+        self.assertEqual(streams[0].status_code, 200)
+        for response in streams:
+            read(response)
+        self.assertEqual(ratelimit.local.inflight, {})
@@ -0,0 +1,80 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Request counts per API key and endpoint. The middleware only appends to
+# an in-memory buffer; totals are added to the database in bulk by the
+# buffer's flush thread.
+
+from typing import NamedTuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce, Greatest
+
+from hackdb.writebehind import WriteBehindBuffer
+
+from .models import APIKey, APIKeyEndpointUsage
+
+
+class Use(NamedTuple):
+    apikey_id: int
+    endpoint: str
+    timestamp: object
+
+
+def totals(uses):
+    # {key: (count, last timestamp)}
+    result = {}
+    for key, timestamp in uses:
+        count, last = result.get(key, (0, timestamp))
+        result[key] = (count + 1, max(last, timestamp))
+    return result
+
+
+def add_usage(queryset, count, last_used):
+    return queryset.update(
+        requests=F("requests") + count,
+        last_used=Greatest(Coalesce("last_used", last_used), last_used),
+    )
+
+
+class UsageBuffer(WriteBehindBuffer):
+    interval_setting = "APIKEYS_USAGE_FLUSH_INTERVAL"
+    size_setting = "APIKEYS_USAGE_FLUSH_SIZE"
+
+    def write(self, uses):
+        with transaction.atomic():
+            for apikey_id, (count, last_used) in totals(
+                (use.apikey_id, use.timestamp) for use in uses
+            ).items():
+                add_usage(APIKey.objects.filter(pk=apikey_id), count, last_used)
+
+            for (apikey_id, endpoint), (count, last_used) in totals(
+                ((use.apikey_id, use.endpoint), use.timestamp) for use in uses
+            ).items():
+                key = {"apikey_id": apikey_id, "endpoint": endpoint}
+                usage = APIKeyEndpointUsage.objects.filter(**key)
+                if add_usage(usage, count, last_used):
+                    continue
+                if not APIKey.objects.filter(pk=apikey_id).exists():
+                    # deleted since the request
+                    continue
+                try:
+                    with transaction.atomic():
+                        APIKeyEndpointUsage.objects.create(
+                            requests=count, last_used=last_used, **key
+                        )
+                except IntegrityError:
+                    # created by another process in the meantime
+                    add_usage(usage, count, last_used)
+
+
+buffer = UsageBuffer()
+
+
+def endpoint_name(request):
+    resolver_match = getattr(request, "resolver_match", None)
+    if resolver_match is None:
+        return ""
+    return resolver_match.view_name[:255]
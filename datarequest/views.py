@@ -72,8 +72,17 @@ def datarequest_download(request):
     data["membershipterms"] = list(
         map(obj_to_dict, request.user.membershipterm_set.all())
     )
-    data["nfctokens"] = list(map(obj_to_dict, request.user.nfctokens.all()))
-    data["nfctokenlogs"] = list(map(obj_to_dict, request.user.nfctokenlogs.all()))
+    data["nfctokens"] = [
+        {
+            **obj_to_dict(token),
+            "last_location": token.last_location and token.last_location.name,
+        }
+        for token in request.user.nfctokens.select_related("last_location")
+    ]
+    data["nfctokenlogs"] = [
+        {**obj_to_dict(log), "location": log.location and log.location.name}
+        for log in request.user.nfctokenlogs.select_related("location")
+    ]
     data["sshkeys"] = list(map(obj_to_dict, request.user.sshkey_set.all()))
 
     try:
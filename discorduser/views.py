@@ -18,21 +18,27 @@ from django.utils import timezone
 from django.views.decorators.cache import never_cache
 from django.views.decorators.http import require_POST
 
+from hackdb import groupmasks
+
 from .models import DiscordUser, DiscordVerificationToken
 
 
 def get_groups(user):
-    return sorted(group.name for group in user.groups.all())
+    groupmasks.index.refresh()
+    return groupmasks.index.group_list(groupmasks.user_mask(user))
 
 
 @never_cache
 @permission_required("discorduser.get_discord_users")
 def api_get_users(request):
     data = {}
-    for discord_user in DiscordUser.objects.all():
+    discord_users = DiscordUser.objects.select_related("user")
+    masks = groupmasks.user_masks(discord_users.values("user"))
+    groupmasks.index.refresh()
+    for discord_user in discord_users:
         data[discord_user.discord_id] = {
             "username": discord_user.user.username,
-            "groups": get_groups(discord_user.user),
+            "groups": groupmasks.index.group_list(masks.get(discord_user.user_id, 0)),
             "name": discord_user.user.get_full_name(),
         }
     return JsonResponse(data)
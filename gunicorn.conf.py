@@ -0,0 +1,10 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Read by gunicorn from the working directory. Serve the ASGI application
+# with uvicorn workers, so that async views and streaming responses run on
+# an event loop rather than through async_to_sync under WSGI.
+
+wsgi_app = "hackdb.asgi:application"
+worker_class = "uvicorn_worker.UvicornWorker"
@@ -0,0 +1,12 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.apps import AppConfig
+
+
+class HackdbConfig(AppConfig):
+    name = "hackdb"
+
+    def ready(self):
+        from . import receivers
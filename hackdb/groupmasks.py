@@ -0,0 +1,128 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Group membership as integer bitmasks, with each Group at bit position
+# Group.pk. Positions never change, so masks stay valid across processes and
+# renames; only the name lookup tables need refreshing when groups change.
+# They are reloaded when the shared version changes, and at least every
+# GROUPMASKS_MAX_AGE seconds.
+
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import transaction
+
+from .versions import aget_version, bump_version, get_version
+
+VERSION_KEY = "hackdb.groupmasks_version"
+MEMO_SIZE = 1024
+
+
+class GroupIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.loaded = 0
+        self.ids = {}
+        self.names = {}
+        self.masks = {}
+        self.group_names = {}
+
+    def is_current(self, version):
+        if version != self.version:
+            return False
+        max_age = settings.GROUPMASKS_MAX_AGE
+        return not max_age or time.monotonic() - self.loaded <= max_age
+
+    def refresh(self, force=False):
+        version = get_version(VERSION_KEY)
+        if self.is_current(version) and not force:
+            return
+        with self.lock:
+            groups = dict(Group.objects.values_list("pk", "name"))
+            self.names = groups
+            self.ids = {name: pk for pk, name in groups.items()}
+            self.masks = {}
+            self.group_names = {}
+            self.version = version
+            self.loaded = time.monotonic()
+
+    async def arefresh(self):
+        version = await aget_version(VERSION_KEY)
+        if not self.is_current(version):
+            await sync_to_async(self.refresh)()
+
+    # mask() and group_list() use the tables as they are, call refresh() or
+    # arefresh() first
+
+    def mask(self, names):
+        # mask for a list of group names, unknown names are ignored
+        if isinstance(names, str):
+            names = [names]
+        key = tuple(sorted(set(names)))
+        masks = self.masks
+        try:
+            return masks[key]
+        except KeyError:
+            pass
+        mask = 0
+        for name in key:
+            if name in self.ids:
+                mask |= 1 << self.ids[name]
+        if len(masks) >= MEMO_SIZE:
+            masks.clear()
+        masks[key] = mask
+        return mask
+
+    def group_list(self, mask):
+        # sorted group names for a mask
+        group_names = self.group_names
+        try:
+            return list(group_names[mask])
+        except KeyError:
+            pass
+        names = sorted(name for pk, name in self.names.items() if mask & (1 << pk))
+        if len(group_names) >= MEMO_SIZE:
+            group_names.clear()
+        group_names[mask] = tuple(names)
+        return names
+
+    def invalidate(self):
+        bump_version(VERSION_KEY)
+
+
+index = GroupIndex()
+
+
+def memberships(user_ids=None):
+    memberships = Group.user_set.through.objects.all()
+    if user_ids is not None:
+        memberships = memberships.filter(user__in=user_ids)
+    return memberships.values_list("user_id", "group_id")
+
+
+def user_masks(user_ids=None):
+    # {user_id: mask} in one query, user_ids may also be a queryset
+    masks = {}
+    for user_id, group_id in memberships(user_ids):
+        masks[user_id] = masks.get(user_id, 0) | (1 << group_id)
+    return masks
+
+
+async def auser_masks(user_ids=None):
+    masks = {}
+    async for user_id, group_id in memberships(user_ids):
+        masks[user_id] = masks.get(user_id, 0) | (1 << group_id)
+    return masks
+
+
+def user_mask(user):
+    return user_masks([user.pk]).get(user.pk, 0)
+
+
+def groups_changed():
+    transaction.on_commit(index.invalidate)
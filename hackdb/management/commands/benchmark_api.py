@@ -0,0 +1,177 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import json
+import random
+import time
+
+import tabulate
+
+from django.contrib.auth.models import Permission
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apikeys.models import APIKey
+from nfctokens.models import NFCToken
+
+PERMISSIONS = [
+    "discorduser.get_discord_users",
+    "membership.get_xero_contacts",
+    "nfctokens.auth_token",
+    "nfctokens.auth_token_groups",
+    "nfctokens.export_tokens",
+]
+
+
+def percentile(values, p):
+    # nearest rank
+    values = sorted(values)
+    rank = max(0, min(len(values) - 1, round(p / 100 * len(values)) - 1))
+    return values[rank]
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure latency and query counts of the API endpoints"
+
+    endpoints = [
+        "nfc_token_auth",
+        "nfc_tokens",
+        "member_count",
+        "xero_contacts_json",
+        "api_get_users",
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--endpoint",
+            choices=self.endpoints,
+            action="append",
+            help="Only run the given endpoint (repeatable)",
+        )
+        parser.add_argument(
+            "--requests", type=int, default=50, help="Requests per endpoint"
+        )
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        setup_test_environment()
+        try:
+            # the API key and any sightings are rolled back afterwards
+            with (
+                transaction.atomic(),
+                override_settings(NFCTOKENS_SIGHTING_FLUSH_INTERVAL=0),
+            ):
+                rows = self.run(
+                    options["endpoint"] or self.endpoints,
+                    options["requests"],
+                    options["warmup"],
+                )
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            teardown_test_environment()
+
+        self.stdout.write(
+            tabulate.tabulate(
+                rows,
+                headers=[
+                    "Endpoint",
+                    "Requests",
+                    "p50 ms",
+                    "p99 ms",
+                    "Max ms",
+                    "Queries p50",
+                    "Queries max",
+                ],
+                floatfmt=".1f",
+            )
+        )
+
+    def run(self, endpoints, count, warmup):
+        apikey = APIKey.objects.create(
+            description="benchmark_api", rate_limit=0, max_concurrent=0
+        )
+        for name in PERMISSIONS:
+            app_label, codename = name.split(".")
+            apikey.permissions.add(
+                Permission.objects.get(
+                    content_type__app_label=app_label, codename=codename
+                )
+            )
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {apikey.key}")
+        self.uids = list(
+            NFCToken.objects.filter(enabled=True).values_list("uid", flat=True)[:1000]
+        ) or ["01234567"]
+
+        rows = []
+        for endpoint in endpoints:
+            request = getattr(self, f"request_{endpoint}")
+            for n in range(warmup):
+                request()
+            times = []
+            queries = []
+            for n in range(count):
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    start = time.perf_counter()
+                    response = request()
+                    times.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    self.stderr.write(f"{endpoint}: HTTP {response.status_code}")
+                queries.append(counter.count)
+            rows.append(
+                [
+                    endpoint,
+                    count,
+                    percentile(times, 50),
+                    percentile(times, 99),
+                    max(times),
+                    percentile(queries, 50),
+                    max(queries),
+                ]
+            )
+        return rows
+
+    def request_nfc_token_auth(self):
+        return self.client.post(
+            "/api/1/nfc_token_auth",
+            json.dumps(
+                {
+                    "uid": self.rng.choice(self.uids),
+                    "location": f"benchmark-{self.rng.randrange(20)}",
+                    "groups": ["members"],
+                }
+            ),
+            content_type="application/json",
+        )
+
+    def request_nfc_tokens(self):
+        return self.client.get("/api/1/nfc_tokens")
+
+    def request_member_count(self):
+        return self.client.get("/api/1/member_stats")
+
+    def request_xero_contacts_json(self):
+        return self.client.get("/api/1/xero_contacts")
+
+    def request_api_get_users(self):
+        return self.client.get("/discorduser/api/users")
@@ -102,7 +102,7 @@ def group_to_dict(group):
 
 
 def apikey_to_dict(apikey):
-    data = {"apikey": obj_to_dict(apikey)}
+    data = {"apikey": obj_to_dict(apikey, ignore=["id", "requests", "last_used"])}
     data["permissions"] = list(
         str(permission) for permission in apikey.permissions.all()
     )
@@ -0,0 +1,224 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+import random
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from discorduser.models import DiscordUser
+from hackdb import groupmasks
+from membership.models import Member, MembershipTerm
+from nfctokens import locations
+from nfctokens.models import NFCToken, NFCTokenLog
+from nfctokens.snapshot import snapshot
+
+BATCH_SIZE = 10000
+
+
+def batched(iterable, size=BATCH_SIZE):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic users, tokens and logs for benchmarking"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--tokens", type=int, default=20000)
+        parser.add_argument("--groups", type=int, default=40)
+        parser.add_argument("--logs", type=int, default=2000000)
+        parser.add_argument("--locations", type=int, default=20)
+        parser.add_argument("--prefix", type=str, default="synthetic")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--force", action="store_true", help="Run even when DEBUG is off"
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["force"]:
+            raise CommandError(
+                "Refusing to add synthetic data without DEBUG or --force"
+            )
+
+        self.rng = random.Random(options["seed"])
+        self.prefix = options["prefix"]
+        if get_user_model().objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(f"Users named {self.prefix}* already exist")
+
+        with transaction.atomic():
+            groups = self.create_groups(options["groups"])
+            users = self.create_users(options["users"])
+            self.create_memberships(users, groups)
+            self.create_members(users)
+            tokens = self.create_tokens(users, options["tokens"])
+        location_ids = list(
+            locations.cache.resolve(
+                [f"{self.prefix}-door-{n}" for n in range(options["locations"])]
+            ).values()
+        )
+        self.create_logs(tokens, location_ids, options["logs"])
+
+        # everything above bypassed the signal handlers
+        groupmasks.index.invalidate()
+        snapshot.invalidate()
+
+    def create_groups(self, count):
+        groups, created = Group.objects.get_or_create(name="members")
+        groups = [groups]
+        groups.extend(
+            Group.objects.bulk_create(
+                Group(name=f"{self.prefix}-{n}") for n in range(count - 1)
+            )
+        )
+        self.stdout.write(f"{len(groups)} groups")
+        return groups
+
+    def create_users(self, count):
+        users = get_user_model().objects.bulk_create(
+            (
+                get_user_model()(
+                    username=f"{self.prefix}{n}",
+                    first_name="Synthetic",
+                    last_name=f"User {n}",
+                    email=f"{self.prefix}{n}@example.com",
+                    is_active=self.rng.random() < 0.95,
+                )
+                for n in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        self.stdout.write(f"{len(users)} users")
+        return users
+
+    def create_memberships(self, users, groups):
+        # members group for most users, then a few others each
+        through = Group.user_set.through
+        rows = []
+        for user in users:
+            chosen = set()
+            if self.rng.random() < 0.7:
+                chosen.add(groups[0])
+            chosen.update(self.rng.sample(groups[1:], min(3, len(groups) - 1)))
+            rows.extend(through(user=user, group=group) for group in chosen)
+        through.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+        self.stdout.write(f"{len(rows)} group memberships")
+
+    def create_members(self, users):
+        today = datetime.date.today()
+        next_number = (
+            Member.objects.order_by("-membership_number")
+            .values_list("membership_number", flat=True)
+            .first()
+            or 0
+        ) + 1
+        members = []
+        terms = []
+        discord = []
+        for user in users:
+            if self.rng.random() < 0.2:
+                continue
+            start = today - datetime.timedelta(days=self.rng.randint(1, 3650))
+            end = None
+            status = Member.MEMBER
+            if self.rng.random() < 0.3:
+                end = start + datetime.timedelta(days=self.rng.randint(30, 1000))
+                status = Member.LEAVING if end >= today else Member.ALUMNI
+            members.append(
+                Member(
+                    user=user,
+                    real_name=user.get_full_name(),
+                    address_locality="Edinburgh",
+                    membership_number=next_number,
+                    membership_status=status,
+                )
+            )
+            next_number += 1
+            terms.append(
+                MembershipTerm(
+                    user=user,
+                    start=start,
+                    end=end,
+                    mtype=self.rng.choice(MembershipTerm.MTYPE_CHOICES)[0],
+                )
+            )
+            if self.rng.random() < 0.5:
+                discord.append(
+                    DiscordUser(
+                        user=user,
+                        discord_id=10**17 + user.pk,
+                        discord_username=user.username,
+                    )
+                )
+        Member.objects.bulk_create(members, batch_size=BATCH_SIZE)
+        MembershipTerm.objects.bulk_create(terms, batch_size=BATCH_SIZE)
+        DiscordUser.objects.bulk_create(discord, batch_size=BATCH_SIZE)
+        self.stdout.write(f"{len(members)} members, {len(discord)} discord users")
+
+    def random_uid(self):
+        if self.rng.random() < 0.3:
+            return f"{self.rng.getrandbits(32):08x}"
+        return f"{self.rng.getrandbits(56):014x}"
+
+    def create_tokens(self, users, count):
+        uids = set(NFCToken.objects.values_list("uid", flat=True))
+        tokens = []
+        while len(tokens) < count:
+            uid = self.random_uid()
+            if uid in uids or uid.startswith("08"):
+                continue
+            uids.add(uid)
+            tokens.append(
+                NFCToken(
+                    uid=uid,
+                    # about one token in twenty is unclaimed
+                    user=self.rng.choice(users) if self.rng.random() < 0.95 else None,
+                    enabled=self.rng.random() < 0.9,
+                )
+            )
+        tokens = NFCToken.objects.bulk_create(tokens, batch_size=BATCH_SIZE)
+        self.stdout.write(f"{len(tokens)} tokens")
+        return tokens
+
+    def create_logs(self, tokens, location_ids, count):
+        now = timezone.now()
+        span = settings.NFCTOKENS_LOG_RETENTION_DAYS * 86400
+
+        def logs():
+            for n in range(count):
+                token = self.rng.choice(tokens)
+                yield NFCTokenLog(
+                    timestamp=now
+                    - datetime.timedelta(seconds=self.rng.randint(0, span)),
+                    uid=token.uid,
+                    token=token,
+                    user_id=token.user_id,
+                    username=token.user.username if token.user_id else "",
+                    location_id=self.rng.choice(location_ids),
+                    authorized=token.enabled and token.user_id is not None,
+                    ltype="auth",
+                )
+
+        written = 0
+        for batch in batched(logs()):
+            with transaction.atomic():
+                NFCTokenLog.objects.bulk_create(batch)
+            written += len(batch)
+            if written % (BATCH_SIZE * 10) == 0:
+                self.stdout.write(f"{written} logs")
+        self.stdout.write(
+            f"{written} logs, run nfctokens_usage_backfill to rebuild usage totals"
+        )
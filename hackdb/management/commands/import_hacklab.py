@@ -16,6 +16,7 @@ from mailman2.models import ChangeOfAddress, MailingList, GroupPolicy
 from groupadmin.models import GroupOwnership, GroupProperties
 from posixusers.models import SSHKey
 from nfctokens.models import NFCToken, NFCTokenLog
+from nfctokens.locations import location_id
 
 
 class Command(BaseCommand):
@@ -193,7 +194,9 @@ class Command(BaseCommand):
                 nfctoken.uid = record["fields"]["uid"]
                 nfctoken.description = record["fields"]["description"]
                 nfctoken.enabled = record["fields"]["enabled"]
-                nfctoken.last_location = record["fields"]["last_location"]
+                nfctoken.last_location_id = location_id(
+                    record["fields"]["last_location"]
+                )
                 nfctoken.last_seen = record["fields"]["last_seen"]
                 nfctoken.save()
                 tokens[record["pk"]] = nfctoken
@@ -207,7 +210,7 @@ class Command(BaseCommand):
                 log.user = user
                 log.token = token
                 log.timestamp = record["fields"]["timestamp"]
-                log.location = record["fields"]["location"]
+                log.location_id = location_id(record["fields"]["location"])
                 log.uid = record["fields"]["uid"]
                 log.name = record["fields"]["name"]
                 log.token_description = record["fields"]["token_description"]
@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Counters and latency histograms kept in memory, rendered in the Prometheus
+# text format. Values are per process: with several workers, each scrape
+# reports the worker that served it, so scrape every worker or aggregate
+# the rates.
+
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+registry = []
+
+
+def escape(value):
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in pairs) + "}"
+
+
+class LabelValues:
+    # Keeps a label whose values come from clients to a bounded set: values
+    # in allowed, or when that is None the first limit values seen, are kept
+    # and anything else is counted as "other".
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seen = set()
+
+    def get(self, value, allowed=None, limit=20):
+        if not value:
+            return ""
+        if allowed is not None:
+            return value if value in allowed else "other"
+        if value in self.seen:
+            return value
+        with self.lock:
+            if len(self.seen) < limit:
+                self.seen.add(value)
+                return value
+        return "other"
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help_, labels=()):
+        self.name = name
+        self.help = help_
+        self.labels = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        registry.append(self)
+
+    def key(self, labels):
+        return tuple(labels.get(name) or "" for name in self.labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            values = {key: self.copy(value) for key, value in self.values.items()}
+        for key in sorted(values):
+            lines.extend(self.render_value(list(zip(self.labels, key)), values[key]))
+        return lines
+
+    def reset(self):
+        with self.lock:
+            self.values = {}
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self.key(labels), 0)
+
+    def copy(self, value):
+        return value
+
+    def render_value(self, pairs, value):
+        return [f"{self.name}_total{format_labels(pairs)} {value}"]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help_, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds, **labels):
+        key = self.key(labels)
+        with self.lock:
+            value = self.values.get(key)
+            if value is None:
+                # per-bucket counts (last one is +Inf), then the sum
+                value = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for n, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    break
+            else:
+                n = len(self.buckets)
+            value[n] += 1
+            value[-1] += seconds
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def copy(self, value):
+        return list(value)
+
+    def render_value(self, pairs, value):
+        lines = []
+        count = 0
+        for bound, n in zip(self.buckets + ("+Inf",), value[:-1]):
+            count += n
+            labels = format_labels(pairs + [("le", bound)])
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        lines.append(f"{self.name}_sum{format_labels(pairs)} {value[-1]}")
+        lines.append(f"{self.name}_count{format_labels(pairs)} {count}")
+        return lines
+
+
+class Stages:
+    # wall time per named stage of a single request
+
+    def __init__(self):
+        self.times = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.times[stage] = self.times.get(stage, 0) + elapsed
+
+    def observe(self, histogram, **labels):
+        for stage, seconds in self.times.items():
+            histogram.observe(seconds, stage=stage, **labels)
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
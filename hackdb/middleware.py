@@ -0,0 +1,34 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import versions
+
+
+class VersionsMiddleware:
+    # read the cache version counters at most once per request
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = versions.current.set(versions.RequestVersions())
+        try:
+            return self.get_response(request)
+        finally:
+            versions.current.reset(token)
+
+    async def __acall__(self, request):
+        token = versions.current.set(versions.RequestVersions())
+        try:
+            return await self.get_response(request)
+        finally:
+            versions.current.reset(token)
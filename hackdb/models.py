@@ -0,0 +1,15 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.db import models
+
+
+class Version(models.Model):
+    # Change counters for the per-process caches, used by hackdb.versions
+    # when the Django cache isn't shared between processes.
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return self.key
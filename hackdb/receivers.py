@@ -0,0 +1,19 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.contrib.auth.models import Group
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import groupmasks
+
+
+@receiver(post_save, sender=Group)
+def group_post_save(sender, instance, **kwargs):
+    groupmasks.groups_changed()
+
+
+@receiver(post_delete, sender=Group)
+def group_post_delete(sender, instance, **kwargs):
+    groupmasks.groups_changed()
@@ -53,6 +53,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "hackdb.middleware.VersionsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -197,7 +198,52 @@ LDAPSYNC_GROUPS_BASE_DN = None
 LDAPSYNC_POSIX_GROUPS_BASE_DN = None
 LDAPSYNC_DOMAIN_SID = None
 LDAPSYNC_DRY_RUN = True
+LDAPSYNC_TIMEOUT = 5  # seconds to connect or wait for a response
+LDAPSYNC_POOL_SIZE = 4
+LDAPSYNC_POOL_WAIT = 30  # seconds to wait for a free connection
+LDAPSYNC_POOL_CHECK_INTERVAL = 60  # idle seconds before a health check
+LDAPSYNC_PAGE_SIZE = 500
+# queue changes for ldapsync_process_queue instead of syncing in the request
+LDAPSYNC_QUEUE = False
+LDAPSYNC_QUEUE_BATCH_SIZE = 100
+LDAPSYNC_QUEUE_INTERVAL = 5
+LDAPSYNC_QUEUE_RETRIES = 10
+LDAPSYNC_QUEUE_RETRY_DELAY = 60  # seconds, doubled after each failure
+
+# background writers (hackdb.writebehind)
+WRITEBEHIND_RETRIES = 5
+WRITEBEHIND_RETRY_DELAY = 1  # seconds, doubled after each failure
+WRITEBEHIND_MAX_PENDING = 10000
+GROUPMASKS_MAX_AGE = 300
+
+APIKEYS_CACHE_MAX_AGE = 300
+APIKEYS_USAGE_FLUSH_INTERVAL = 30
+APIKEYS_USAGE_FLUSH_SIZE = 1000
+# per key, overridden by the key's own settings
+APIKEYS_RATE_LIMIT = 600  # requests per minute
+APIKEYS_RATE_BURST = 60
+APIKEYS_MAX_CONCURRENT = 8
+# cache alias to share rate limits between processes, None for per-process
+APIKEYS_RATELIMIT_CACHE = None
+# open streaming responses per key, counted apart from APIKEYS_MAX_CONCURRENT
+APIKEYS_MAX_STREAMS = 8
 
 NFCTOKENS_USER_ENABLED_LIMIT = 10
 NFCTOKENS_USER_TOTAL_LIMIT = 20
 NFCTOKENS_LOG_RETENTION_DAYS = 30
+NFCTOKENS_LOG_PAGE_SIZE = 50
+NFCTOKENS_SNAPSHOT_MAX_AGE = 300
+NFCTOKENS_SIGHTING_FLUSH_INTERVAL = 2
+NFCTOKENS_SIGHTING_FLUSH_SIZE = 200
+NFCTOKENS_AUTH_BATCH_LIMIT = 1000
+NFCTOKENS_EXPIRE_BATCH_SIZE = 10000
+NFCTOKENS_EXPIRE_BATCH_PAUSE = 0.5
+NFCTOKENS_ARCHIVE_DIR = None
+NFCTOKENS_EVENTS_POLL_INTERVAL = 1
+NFCTOKENS_EVENTS_HEARTBEAT = 15
+NFCTOKENS_EVENTS_MAX_AGE = 3600
+NFCTOKENS_EVENTS_RETRY = 5
+# location label values for the auth metrics, anything else is "other"; when
+# None, the first NFCTOKENS_METRICS_MAX_LOCATIONS locations seen are used
+NFCTOKENS_METRICS_LOCATIONS = None
+NFCTOKENS_METRICS_MAX_LOCATIONS = 20
@@ -0,0 +1,108 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.contrib.auth.models import Group
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import metrics, versions
+from .groupmasks import GroupIndex
+from .writebehind import WriteBehindBuffer
+
+
+class FlakyBuffer(WriteBehindBuffer):
+    interval_setting = "FLAKY_FLUSH_INTERVAL"
+    size_setting = "FLAKY_FLUSH_SIZE"
+
+    def __init__(self, failures):
+        super().__init__()
+        self.remaining_failures = failures
+        self.written = []
+
+    def write(self, items):
+        if self.remaining_failures:
+            self.remaining_failures -= 1
+            raise RuntimeError("database is locked")
+        self.written.extend(items)
+
+
+@override_settings(
+    FLAKY_FLUSH_INTERVAL=0,
+    FLAKY_FLUSH_SIZE=10,
+    WRITEBEHIND_RETRIES=2,
+    WRITEBEHIND_RETRY_DELAY=0,
+    WRITEBEHIND_MAX_PENDING=3,
+)
+class WriteBehindBufferTestCase(SimpleTestCase):
+    def test_retry(self):
+        buffer = FlakyBuffer(failures=2)
+        with self.assertLogs("hackdb.writebehind", "WARNING"):
+            buffer.add(1)
+            buffer.add(2)
+        buffer.add(3)
+        self.assertEqual(buffer.written, [1, 2, 3])
+
+    def test_retries_exhausted(self):
+        buffer = FlakyBuffer(failures=3)
+        with self.assertLogs("hackdb.writebehind", "WARNING"):
+            buffer.add(1)
+            buffer.add(2)
+            buffer.add(3)
+        buffer.add(4)
+        self.assertEqual(buffer.written, [4])
+
+    @override_settings(WRITEBEHIND_RETRY_DELAY=60)
+    def test_backoff_and_limit(self):
+        buffer = FlakyBuffer(failures=1)
+        with self.assertLogs("hackdb.writebehind", "WARNING"):
+            buffer.add(1)
+            buffer.add(2, 3, 4)
+        self.assertEqual(buffer.written, [])
+        self.assertEqual(buffer.pending, [2, 3, 4])
+        buffer.flush(force=True)
+        self.assertEqual(buffer.written, [2, 3, 4])
+
+
+@override_settings(GROUPMASKS_MAX_AGE=300)
+class GroupIndexTestCase(TestCase):
+    def test_max_age(self):
+        index = GroupIndex()
+        index.refresh()
+        # created without signals, as if the version bump had been missed
+        Group.objects.bulk_create([Group(name="late")])
+        index.refresh()
+        self.assertNotIn("late", index.ids)
+        index.loaded -= 301
+        index.refresh()
+        self.assertIn("late", index.ids)
+
+
+class VersionsTestCase(TestCase):
+    def test_request(self):
+        token = versions.current.set(versions.RequestVersions())
+        self.addCleanup(versions.current.reset, token)
+        with self.assertNumQueries(1):
+            self.assertEqual(versions.get_version("test.a"), 0)
+            self.assertEqual(versions.get_version("test.b"), 0)
+        value = versions.bump_version("test.a")
+        with self.assertNumQueries(0):
+            self.assertEqual(versions.get_version("test.a"), value)
+
+    def test_outside_request(self):
+        versions.bump_version("test.a")
+        with self.assertNumQueries(2):
+            self.assertEqual(versions.get_version("test.a"), 1)
+            self.assertEqual(versions.get_version("test.a"), 1)
+
+
+class LabelValuesTestCase(SimpleTestCase):
+    def test_limit(self):
+        labels = metrics.LabelValues()
+        values = {labels.get(f"door {i % 5}", limit=3) for i in range(20)}
+        self.assertEqual(values, {"door 0", "door 1", "door 2", "other"})
+        self.assertEqual(labels.get(None), "")
+
+    def test_allowed(self):
+        labels = metrics.LabelValues()
+        self.assertEqual(labels.get("door", allowed=["door"]), "door")
+        self.assertEqual(labels.get("gate", allowed=["door"]), "other")
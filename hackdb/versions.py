@@ -0,0 +1,94 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Version counters used by per-process caches to notice that another process
+# has changed the underlying data. They are held in the Django cache when
+# CACHES points at a backend shared between processes (memcached, redis,
+# database), and in the Version table otherwise, so that every worker and
+# management command sees every bump.
+#
+# Within a request (see hackdb.middleware.VersionsMiddleware) the table is
+# read once, on the first check, and the same values are used for the rest
+# of the request, so the caches it consults cost one query between them.
+
+import contextvars
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import Version
+
+
+def shared_cache():
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+# versions read so far in the current request, None outside a request
+current = contextvars.ContextVar("versions", default=None)
+
+
+class RequestVersions:
+    def __init__(self):
+        self.values = None
+
+
+def all_versions():
+    return Version.objects.values_list("key", "value")
+
+
+def single_version(key):
+    return Version.objects.filter(key=key).values_list("value", flat=True)
+
+
+def get_version(key):
+    if shared_cache():
+        return cache.get(key, 0)
+    versions = current.get()
+    if versions is None:
+        return single_version(key).first() or 0
+    if versions.values is None:
+        versions.values = dict(all_versions())
+    return versions.values.get(key, 0)
+
+
+async def aget_version(key):
+    if shared_cache():
+        return await cache.aget(key, 0)
+    versions = current.get()
+    if versions is None:
+        return await single_version(key).afirst() or 0
+    if versions.values is None:
+        versions.values = {name: value async for name, value in all_versions()}
+    return versions.values.get(key, 0)
+
+
+def bump_version(key):
+    if shared_cache():
+        if cache.add(key, 1, timeout=None):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # evicted between add() and incr()
+            cache.set(key, 1, timeout=None)
+            return 1
+
+    versions = Version.objects.filter(key=key)
+    with transaction.atomic():
+        if not versions.update(value=F("value") + 1):
+            try:
+                with transaction.atomic():
+                    Version.objects.create(key=key, value=1)
+            except IntegrityError:
+                # created by another process in the meantime
+                versions.update(value=F("value") + 1)
+        value = versions.values_list("value", flat=True).get()
+    # later checks in this request see the bump
+    request_versions = current.get()
+    if request_versions is not None and request_versions.values is not None:
+        request_versions.values[key] = value
+    return value
@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import atexit
+import logging
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    # Collects items in memory and hands them to write() in batches from a
+    # background thread, every interval_setting seconds or as soon as
+    # size_setting items are waiting. An interval of 0 writes synchronously.
+    #
+    # write() must be all-or-nothing. A batch that fails is put back and
+    # retried with exponential backoff, and is only dropped after
+    # WRITEBEHIND_RETRIES failed attempts. At most WRITEBEHIND_MAX_PENDING
+    # items are held, the oldest are dropped beyond that.
+
+    interval_setting = None
+    size_setting = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending = []
+        self.thread = None
+        self.failures = 0
+        self.retry_at = 0
+        atexit.register(self.flush, force=True)
+
+    @property
+    def interval(self):
+        return getattr(settings, self.interval_setting)
+
+    @property
+    def size(self):
+        return getattr(settings, self.size_setting)
+
+    def add(self, *items):
+        with self.lock:
+            self.pending.extend(items)
+            self.trim()
+            waiting = len(self.pending)
+        if not self.interval:
+            self.flush()
+            return
+        self.start()
+        if waiting >= self.size:
+            self.wakeup.set()
+
+    async def aadd(self, *items):
+        if self.interval:
+            # only touches memory
+            self.add(*items)
+        else:
+            await sync_to_async(self.add)(*items)
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            with self.lock:
+                if self.thread is None or not self.thread.is_alive():
+                    self.thread = threading.Thread(
+                        target=self.run, name=type(self).__name__, daemon=True
+                    )
+                    self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            close_old_connections()
+            self.flush()
+
+    def trim(self):
+        # called with self.lock held
+        excess = len(self.pending) - settings.WRITEBEHIND_MAX_PENDING
+        if excess > 0:
+            del self.pending[:excess]
+            logger.error(f"{type(self).__name__}: buffer full, dropped {excess} items")
+
+    def flush(self, force=False):
+        with self.flush_lock:
+            if not force and time.monotonic() < self.retry_at:
+                # backing off after a failure
+                return
+            with self.lock:
+                items = self.pending
+                self.pending = []
+            if not items:
+                return
+            try:
+                self.write(items)
+            except Exception:
+                self.failed(items)
+            else:
+                self.failures = 0
+                self.retry_at = 0
+
+    def failed(self, items):
+        self.failures += 1
+        if self.failures > settings.WRITEBEHIND_RETRIES:
+            logger.exception(
+                f"{type(self).__name__}: dropped {len(items)} items "
+                f"after {self.failures} attempts"
+            )
+            self.failures = 0
+            self.retry_at = 0
+            return
+        delay = settings.WRITEBEHIND_RETRY_DELAY * 2 ** (self.failures - 1)
+        logger.warning(
+            f"{type(self).__name__}: writing {len(items)} items failed, "
+            f"retrying in {delay}s",
+            exc_info=True,
+        )
+        self.retry_at = time.monotonic() + delay
+        with self.lock:
+            self.pending[:0] = items
+            self.trim()
+
+    def write(self, items):
+        raise NotImplementedError
@@ -8,12 +8,12 @@ from django.contrib.auth.models import Group
 from django.core.management.base import BaseCommand
 
 from ldapsync.serializers import (
-    serialize_group,
-    serialize_posixgroup,
-    serialize_posixuser_group,
-    serialize_user,
+    serialize_groups,
+    serialize_posixgroups,
+    serialize_posixuser_groups,
+    serialize_users,
 )
-from ldapsync.utils import LDAP
+from ldapsync.utils import LDAP, pool
 
 
 class Command(BaseCommand):
@@ -21,6 +21,11 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Read every entry back, including those unchanged since the last sync",
+        )
 
     def handle(self, *args, **options):
         if options["verbosity"] > 2:
@@ -28,39 +33,55 @@ class Command(BaseCommand):
         else:
             debug = False
 
-        server = LDAP(dry_run=options["dry_run"], debug=debug)
+        with pool.connection() as connection:
+            server = LDAP(
+                dry_run=options["dry_run"],
+                debug=debug,
+                connection=connection,
+                verify=options["verify"],
+            )
+            server.load_digests()
+            if options["verify"] or not server.digests:
+                # one read of each subtree, compared locally; otherwise only
+                # entries that changed since the last sync are read
+                for base_dn in [
+                    settings.LDAPSYNC_USERS_BASE_DN,
+                    settings.LDAPSYNC_GROUPS_BASE_DN,
+                    settings.LDAPSYNC_POSIX_GROUPS_BASE_DN,
+                ]:
+                    if base_dn:
+                        server.load(base_dn)
 
-        if settings.LDAPSYNC_USERS_BASE_DN:
-            for user in get_user_model().objects.all():
-                dn, entry = serialize_user(
-                    user, settings.LDAPSYNC_USERS_BASE_DN, settings.LDAPSYNC_DOMAIN_SID
-                )
-                server.sync_entry(dn, entry)
+            if settings.LDAPSYNC_USERS_BASE_DN:
+                for dn, entry in serialize_users(
+                    get_user_model().objects.all(),
+                    settings.LDAPSYNC_USERS_BASE_DN,
+                    settings.LDAPSYNC_DOMAIN_SID,
+                ):
+                    server.sync_entry(dn, entry)
 
-            if settings.LDAPSYNC_GROUPS_BASE_DN:
-                for group in Group.objects.all():
-                    dn, entry = serialize_group(
-                        group,
+                if settings.LDAPSYNC_GROUPS_BASE_DN:
+                    for dn, entry in serialize_groups(
+                        Group.objects.all(),
                         settings.LDAPSYNC_GROUPS_BASE_DN,
                         settings.LDAPSYNC_USERS_BASE_DN,
-                    )
-                    server.sync_entry(dn, entry)
+                    ):
+                        server.sync_entry(dn, entry)
 
-        if settings.LDAPSYNC_POSIX_GROUPS_BASE_DN:
-            for group in Group.objects.filter(posix__isnull=False):
-                dn, entry = serialize_posixgroup(
-                    group, settings.LDAPSYNC_POSIX_GROUPS_BASE_DN
-                )
-                server.sync_entry(dn, entry)
-            for user in get_user_model().objects.all():
-                dn, entry = serialize_posixuser_group(
-                    user, settings.LDAPSYNC_POSIX_GROUPS_BASE_DN
-                )
-                server.sync_entry(dn, entry)
+            if settings.LDAPSYNC_POSIX_GROUPS_BASE_DN:
+                for dn, entry in serialize_posixgroups(
+                    Group.objects.all(), settings.LDAPSYNC_POSIX_GROUPS_BASE_DN
+                ):
+                    server.sync_entry(dn, entry)
+                for dn, entry in serialize_posixuser_groups(
+                    get_user_model().objects.all(),
+                    settings.LDAPSYNC_POSIX_GROUPS_BASE_DN,
+                ):
+                    server.sync_entry(dn, entry)
 
-        if settings.LDAPSYNC_USERS_BASE_DN:
-            server.auto_delete(settings.LDAPSYNC_USERS_BASE_DN)
-            if settings.LDAPSYNC_GROUPS_BASE_DN:
-                server.auto_delete(settings.LDAPSYNC_GROUPS_BASE_DN)
-        if settings.LDAPSYNC_POSIX_GROUPS_BASE_DN:
-            server.auto_delete(settings.LDAPSYNC_POSIX_GROUPS_BASE_DN)
+            if settings.LDAPSYNC_USERS_BASE_DN:
+                server.auto_delete(settings.LDAPSYNC_USERS_BASE_DN)
+                if settings.LDAPSYNC_GROUPS_BASE_DN:
+                    server.auto_delete(settings.LDAPSYNC_GROUPS_BASE_DN)
+            if settings.LDAPSYNC_POSIX_GROUPS_BASE_DN:
+                server.auto_delete(settings.LDAPSYNC_POSIX_GROUPS_BASE_DN)
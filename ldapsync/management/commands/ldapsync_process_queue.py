@@ -0,0 +1,51 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from ldap3.core.exceptions import LDAPException
+
+from ldapsync import queue
+
+
+class Command(BaseCommand):
+    help = "Sync users and groups queued by the ldapsync signal receivers"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.LDAPSYNC_QUEUE_BATCH_SIZE
+        )
+        parser.add_argument("--dry-run", action="store_true")
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running, checking the queue every --interval seconds",
+        )
+        parser.add_argument(
+            "--interval", type=float, default=settings.LDAPSYNC_QUEUE_INTERVAL
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # entries that fail are queued again, and wait for the next pass
+            started = timezone.now()
+            total = 0
+            try:
+                while count := queue.process(
+                    options["batch_size"], dry_run=options["dry_run"], before=started
+                ):
+                    total += count
+            except LDAPException as e:
+                # the rest of the queue waits for the next pass
+                if not options["loop"]:
+                    raise CommandError(f"LDAP error: {e}")
+                self.stderr.write(f"LDAP error: {e}")
+            if options["verbosity"] > 1 and total:
+                self.stdout.write(f"processed {total} queued entries")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
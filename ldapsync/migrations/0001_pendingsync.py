@@ -0,0 +1,45 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:11
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingSync",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("user", "User"), ("group", "Group")], max_length=5
+                    ),
+                ),
+                ("object_id", models.PositiveBigIntegerField()),
+                ("queued", models.DateTimeField(default=django.utils.timezone.now)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["queued"], name="ldapsync_pe_queued_d67dce_idx"
+                    )
+                ],
+                "unique_together": {("kind", "object_id")},
+            },
+        ),
+    ]
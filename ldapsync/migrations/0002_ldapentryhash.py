@@ -0,0 +1,34 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ldapsync", "0001_pendingsync"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LDAPEntryHash",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dn", models.CharField(max_length=1024, unique=True)),
+                ("digest", models.CharField(blank=True, max_length=64)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "LDAP entry hash",
+                "verbose_name_plural": "LDAP entry hashes",
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.db import models
+from django.utils import timezone
+
+
+class PendingSync(models.Model):
+    # Users and groups waiting for ldapsync_process_queue. Each object is
+    # queued at most once; queueing it again moves its timestamp forward.
+    USER = "user"
+    GROUP = "group"
+    KIND_CHOICES = [(USER, "User"), (GROUP, "Group")]
+
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    queued = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ("kind", "object_id")
+        indexes = [models.Index(fields=["queued"])]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+
+class LDAPEntryHash(models.Model):
+    # Hash of each entry as last written to the directory, by normalised DN,
+    # so that unchanged entries can be skipped without reading them. An
+    # empty digest means the entry is known to be absent.
+    dn = models.CharField(max_length=1024, unique=True)
+    digest = models.CharField(max_length=64, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "LDAP entry hash"
+        verbose_name_plural = "LDAP entry hashes"
+
+    def __str__(self):
+        return self.dn
@@ -0,0 +1,131 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# A bounded, process-wide pool of bound LDAP connections, so that syncing
+# from a signal receiver doesn't open a new connection, TLS session and bind
+# for every save.
+#
+# Connections that are closed or unbound are replaced before being handed
+# out, and those that have been idle for LDAPSYNC_POOL_CHECK_INTERVAL seconds
+# are also checked with a root DSE search. A connection that raises an LDAP error while borrowed
+# is closed rather than returned.
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import ldap3
+from django.conf import settings
+from ldap3.core.exceptions import LDAPException
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    pass
+
+
+def healthy(connection):
+    if connection.closed or not connection.bound:
+        return False
+    try:
+        return connection.search(
+            search_base="",
+            search_filter="(objectClass=*)",
+            search_scope=ldap3.BASE,
+            attributes=["1.1"],
+        )
+    except LDAPException:
+        return False
+
+
+def close(connection):
+    try:
+        connection.unbind()
+    except LDAPException:
+        pass
+
+
+class ConnectionPool:
+    def __init__(self, connect):
+        self.connect = connect
+        self.condition = threading.Condition()
+        self.reset()
+
+    def reset(self):
+        # connections inherited from a parent process share its sockets
+        self.pid = os.getpid()
+        self.idle = []
+        self.open = 0
+
+    def checkout(self):
+        deadline = time.monotonic() + settings.LDAPSYNC_POOL_WAIT
+        with self.condition:
+            if self.pid != os.getpid():
+                self.reset()
+            while not self.idle and self.open >= settings.LDAPSYNC_POOL_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(
+                        f"no LDAP connection free after {settings.LDAPSYNC_POOL_WAIT}s"
+                    )
+                self.condition.wait(remaining)
+            if self.idle:
+                connection, returned = self.idle.pop()
+            else:
+                connection, returned = None, None
+            self.open += 1
+
+        try:
+            if connection is not None:
+                idle = time.monotonic() - returned
+                if idle < settings.LDAPSYNC_POOL_CHECK_INTERVAL:
+                    # without a round trip to the server
+                    usable = not connection.closed and connection.bound
+                else:
+                    usable = healthy(connection)
+                if usable:
+                    return connection
+                logger.info("replacing stale LDAP connection")
+                close(connection)
+            return self.connect()
+        except BaseException:
+            self.discard(None)
+            raise
+
+    def checkin(self, connection):
+        with self.condition:
+            self.open -= 1
+            if self.pid == os.getpid():
+                self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection):
+        if connection is not None:
+            close(connection)
+        with self.condition:
+            self.open -= 1
+            self.condition.notify()
+
+    @contextmanager
+    def connection(self):
+        connection = self.checkout()
+        try:
+            yield connection
+        except LDAPException:
+            self.discard(connection)
+            raise
+        except BaseException:
+            self.checkin(connection)
+            raise
+        else:
+            self.checkin(connection)
+
+    def close_all(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for connection, returned in idle:
+            close(connection)
@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# With LDAPSYNC_QUEUE enabled, the signal receivers only record which users
+# and groups have changed, and ldapsync_process_queue syncs them later. Each
+# object is queued once however often it changes, so a burst of saves
+# becomes a single sync of each entry.
+#
+# An entry that fails is retried after LDAPSYNC_QUEUE_RETRY_DELAY seconds,
+# doubled after each failure, and dropped after LDAPSYNC_QUEUE_RETRIES
+# attempts. Queueing it again, because the object changed, starts over.
+# An LDAP error ends the batch, as the connection can't be trusted any more.
+
+import datetime
+import logging
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models import Q
+from django.utils import timezone
+from ldap3.core.exceptions import LDAPException
+
+from .models import PendingSync
+from .serializers import prefetch_groups, prefetch_users
+from .utils import LDAP, pool, sync_group, sync_user
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(kind, ids):
+    now = timezone.now()
+    PendingSync.objects.bulk_create(
+        [PendingSync(kind=kind, object_id=pk, queued=now) for pk in ids],
+        update_conflicts=True,
+        unique_fields=["kind", "object_id"],
+        update_fields=["queued", "attempts"],
+    )
+
+
+def enqueue_users(ids):
+    enqueue(PendingSync.USER, ids)
+
+
+def enqueue_groups(ids):
+    enqueue(PendingSync.GROUP, ids)
+
+
+def process(batch_size=100, dry_run=False, before=None):
+    # sync one batch over a single connection, returns the number of queue
+    # entries taken from the queue
+    items = PendingSync.objects.filter(queued__lte=timezone.now()).order_by("queued")
+    if before is not None:
+        items = items.filter(queued__lt=before)
+    items = list(items[:batch_size])
+    if not items:
+        return 0
+
+    ids = {PendingSync.USER: [], PendingSync.GROUP: []}
+    for item in items:
+        ids[item.kind].append(item.object_id)
+    objects = {
+        PendingSync.USER: prefetch_users(get_user_model().objects.all()).in_bulk(
+            ids[PendingSync.USER]
+        ),
+        PendingSync.GROUP: prefetch_groups(Group.objects.all()).in_bulk(
+            ids[PendingSync.GROUP]
+        ),
+    }
+    sync = {PendingSync.USER: sync_user, PendingSync.GROUP: sync_group}
+
+    done = []
+    failed = []
+    try:
+        with pool.connection() as connection:
+            server = LDAP(dry_run=dry_run, connection=connection)
+            for item in items:
+                obj = objects[item.kind].get(item.object_id)
+                if obj is None:
+                    # deleted since it was queued
+                    done.append(item)
+                    continue
+                try:
+                    sync[item.kind](obj, server=server)
+                except LDAPException:
+                    # raised through pool.connection() so that the connection
+                    # is discarded, the rest of the batch waits
+                    failed.append(item)
+                    raise
+                except Exception:
+                    logger.exception(f"Exception in ldapsync of {item.kind} {obj}")
+                    failed.append(item)
+                else:
+                    done.append(item)
+    finally:
+        finish(done, failed)
+    return len(items)
+
+
+def finish(done, failed):
+    if done:
+        # entries queued again while being synced are left for the next batch
+        PendingSync.objects.filter(
+            reduce(operator.or_, (Q(pk=item.pk, queued=item.queued) for item in done))
+        ).delete()
+    now = timezone.now()
+    for item in failed:
+        attempts = item.attempts + 1
+        if attempts >= settings.LDAPSYNC_QUEUE_RETRIES:
+            logger.error(f"Giving up ldapsync of {item} after {attempts} attempts")
+            PendingSync.objects.filter(pk=item.pk, queued=item.queued).delete()
+            continue
+        delay = settings.LDAPSYNC_QUEUE_RETRY_DELAY * 2 ** (attempts - 1)
+        PendingSync.objects.filter(pk=item.pk, queued=item.queued).update(
+            queued=now + datetime.timedelta(seconds=delay), attempts=attempts
+        )
@@ -12,11 +12,26 @@ from django.dispatch import receiver
 
 from posixusers.models import PosixGroup, PosixUser, SSHKey
 
+from . import queue
 from .utils import sync_group, sync_user
 
 logger = logging.getLogger(__name__)
 
 
+def schedule_user(user):
+    if not settings.LDAPSYNC_QUEUE:
+        sync_user(user)
+    elif settings.LDAPSYNC_USERS_BASE_DN:
+        queue.enqueue_users([user.pk])
+
+
+def schedule_group(group):
+    if not settings.LDAPSYNC_QUEUE:
+        sync_group(group)
+    elif settings.LDAPSYNC_GROUPS_BASE_DN:
+        queue.enqueue_groups([group.pk])
+
+
 @receiver(post_save, sender=get_user_model())
 def sync_ldap_user(sender, instance, update_fields=[], **kwargs):
     if update_fields and list(update_fields) == ["last_login"]:
@@ -24,7 +39,7 @@ def sync_ldap_user(sender, instance, update_fields=[], **kwargs):
         return
     try:
         logger.info(f"ldapsync user {instance}")
-        sync_user(instance)
+        schedule_user(instance)
     except Exception:
         logger.exception(f"Exception in ldapsync of {instance}")
 
@@ -33,7 +48,7 @@ def sync_ldap_user(sender, instance, update_fields=[], **kwargs):
 def sync_ldap_posix_user(sender, instance, **kwargs):
     try:
         logger.info(f"ldapsync user {instance.user} (for PosixUser)")
-        sync_user(instance.user)
+        schedule_user(instance.user)
     except Exception:
         logger.exception(f"Exception in ldapsync of {instance}")
 
@@ -42,7 +57,7 @@ def sync_ldap_posix_user(sender, instance, **kwargs):
 def sync_ldap_posix_sshkey(sender, instance, **kwargs):
     try:
         logger.info(f"ldapsync user {instance.user} (for SSHKey)")
-        sync_user(instance.user)
+        schedule_user(instance.user)
     except Exception:
         logger.exception(f"Exception in ldapsync of {instance}")
 
@@ -51,7 +66,7 @@ def sync_ldap_posix_sshkey(sender, instance, **kwargs):
 def sync_ldap_group(sender, instance, **kwargs):
     try:
         logger.info(f"ldapsync group {instance}")
-        sync_group(instance)
+        schedule_group(instance)
     except Exception:
         logger.exception(f"Exception in ldapsync of {instance}")
 
@@ -60,7 +75,7 @@ def sync_ldap_group(sender, instance, **kwargs):
 def sync_ldap_posix_group(sender, instance, **kwargs):
     try:
         logger.info(f"ldapsync user {instance.group} (for PosixGroup)")
-        sync_group(instance.group)
+        schedule_group(instance.group)
     except Exception:
         logger.exception(f"Exception in ldapsync of {instance}")
 
@@ -75,7 +90,7 @@ def sync_ldap_group_m2m(sender, instance, *, action=None, **kwargs):
     if action in ["post_add", "post_remove"]:
         try:
             logger.info(f"ldapsync group {instance} (for membership)")
-            sync_group(instance)
+            schedule_group(instance)
         except Exception as e:
             logger.exception(f"Exception in ldapsync of {instance}")
 
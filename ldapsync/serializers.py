@@ -1,3 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+
+from nfctokens.models import NFCToken
+from posixusers.models import SSHKey
+
+# The serializers work on single objects, querying for related rows as
+# needed. Objects from prefetch_users() and prefetch_groups() carry those
+# rows already, so a whole directory is serialized with a fixed number of
+# queries.
+
+
+def enabled_sshkeys(user):
+    if hasattr(user, "enabled_sshkeys"):
+        return user.enabled_sshkeys
+    return list(user.sshkey_set.filter(enabled=True).order_by("pk"))
+
+
+def enabled_nfctokens(user):
+    if hasattr(user, "enabled_nfctokens"):
+        return user.enabled_nfctokens
+    return list(user.nfctokens.filter(enabled=True).order_by("uid"))
+
+
+def active_members(group):
+    if hasattr(group, "active_members"):
+        return group.active_members
+    return group.user_set.filter(is_active=True).order_by("username")
+
+
+def prefetch_users(queryset):
+    return queryset.select_related("posix").prefetch_related(
+        Prefetch(
+            "sshkey_set",
+            queryset=SSHKey.objects.filter(enabled=True).order_by("pk"),
+            to_attr="enabled_sshkeys",
+        ),
+        Prefetch(
+            "nfctokens",
+            queryset=NFCToken.objects.filter(enabled=True).order_by("uid"),
+            to_attr="enabled_nfctokens",
+        ),
+    )
+
+
+def prefetch_groups(queryset):
+    return queryset.select_related("posix", "properties").prefetch_related(
+        Prefetch(
+            "user_set",
+            queryset=get_user_model()
+            .objects.filter(is_active=True)
+            .order_by("username"),
+            to_attr="active_members",
+        )
+    )
+
+
 def serialize_user(user, base_dn, domain_sid=None):
     dn = f"uid={user.username},{base_dn}"
     if not user.is_active:
@@ -22,14 +79,16 @@ def serialize_user(user, base_dn, domain_sid=None):
             entry["objectClass"].append("sambaSamAccount")
             entry["sambaSID"] = [f"{domain_sid}-{user.posix.uid * 2 + 1000}"]
             entry["sambaAcctFlags"] = ["[U          ]"]
-        if len(user.sshkey_set.filter(enabled=True)) > 0:
+        sshkeys = enabled_sshkeys(user)
+        if len(sshkeys) > 0:
             entry["objectClass"].append("ldapPublicKey")
             entry["sshPublicKey"] = []
-            for sshkey in user.sshkey_set.filter(enabled=True):
+            for sshkey in sshkeys:
                 entry["sshPublicKey"].append(sshkey.key.encode())
-        if len(user.nfctokens.filter(enabled=True)) > 0:
+        nfctokens = enabled_nfctokens(user)
+        if len(nfctokens) > 0:
             entry["ehlabNfcToken"] = []
-            for nfctoken in user.nfctokens.filter(enabled=True).order_by("uid"):
+            for nfctoken in nfctokens:
                 entry["ehlabNfcToken"].append(nfctoken.uid)
         if user.posix.password:
             if user.posix.password.lower().startswith("{ssha}"):
@@ -46,7 +105,7 @@ def serialize_group(group, base_dn, users_base_dn):
         "cn": [group.name],
         "member": [],
     }
-    for user in group.user_set.filter(is_active=True).order_by("username"):
+    for user in active_members(group):
         entry["member"].append(f"uid={user.username},{users_base_dn}")
     if len(entry["member"]) == 0:
         return dn, None
@@ -66,7 +125,7 @@ def serialize_posixgroup(group, base_dn):
         "gidNumber": [group.posix.gid],
         "memberUid": [],
     }
-    for user in group.user_set.filter(is_active=True).order_by("username"):
+    for user in active_members(group):
         entry["memberUid"].append(user.username)
     if len(entry["memberUid"]) == 0:
         return dn, None
@@ -83,3 +142,23 @@ def serialize_posixuser_group(user, base_dn):
         "gidNumber": [user.posix.uid],
     }
     return dn, entry
+
+
+def serialize_users(users, base_dn, domain_sid=None):
+    for user in prefetch_users(users):
+        yield serialize_user(user, base_dn, domain_sid)
+
+
+def serialize_groups(groups, base_dn, users_base_dn):
+    for group in prefetch_groups(groups):
+        yield serialize_group(group, base_dn, users_base_dn)
+
+
+def serialize_posixgroups(groups, base_dn):
+    for group in prefetch_groups(groups.filter(posix__isnull=False)):
+        yield serialize_posixgroup(group, base_dn)
+
+
+def serialize_posixuser_groups(users, base_dn):
+    for user in users.select_related("posix"):
+        yield serialize_posixuser_group(user, base_dn)
@@ -0,0 +1,316 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from unittest import mock
+
+import ldap3
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from ldap3.core.exceptions import LDAPSocketOpenError, LDAPSocketSendError
+
+from . import queue, serializers
+from .models import LDAPEntryHash, PendingSync
+from .pool import ConnectionPool, PoolExhausted
+from .utils import LDAP, pool
+
+
+@override_settings(
+    LDAPSYNC_POOL_SIZE=2, LDAPSYNC_POOL_WAIT=0, LDAPSYNC_POOL_CHECK_INTERVAL=60
+)
+class ConnectionPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = ldap3.Server("mock")
+        self.connections = []
+        self.pool = ConnectionPool(self.connect)
+
+    def connect(self):
+        # a simple bind, the mock strategy doesn't count anonymous binds
+        connection = ldap3.Connection(
+            self.server,
+            user="cn=hackdb,dc=example,dc=org",
+            password="secret",
+            client_strategy=ldap3.MOCK_SYNC,
+        )
+        connection.strategy.add_entry(
+            "cn=hackdb,dc=example,dc=org", {"userPassword": "secret"}
+        )
+        connection.bind()
+        self.connections.append(connection)
+        return connection
+
+    def test_reuse(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            self.assertIs(second, first)
+        self.assertEqual(len(self.connections), 1)
+
+    def test_size(self):
+        with self.pool.connection():
+            with self.pool.connection():
+                with self.assertRaises(PoolExhausted):
+                    with self.pool.connection():
+                        pass
+        with self.pool.connection():
+            pass
+        self.assertEqual(len(self.connections), 2)
+
+    def test_failure(self):
+        with self.assertRaises(LDAPSocketOpenError):
+            with self.pool.connection():
+                raise LDAPSocketOpenError()
+        self.assertTrue(self.connections[0].closed)
+        with self.pool.connection() as connection:
+            self.assertIs(connection, self.connections[1])
+
+    def test_closed(self):
+        with self.pool.connection():
+            pass
+        # replaced before the health check interval is up
+        self.connections[0].unbind()
+        with self.pool.connection() as connection:
+            self.assertIs(connection, self.connections[1])
+
+    @override_settings(LDAPSYNC_POOL_CHECK_INTERVAL=0)
+    def test_health_check(self):
+        with self.pool.connection():
+            pass
+        self.connections[0].unbind()
+        with self.pool.connection() as connection:
+            self.assertIs(connection, self.connections[1])
+
+
+@override_settings(
+    LDAPSYNC_QUEUE=True,
+    LDAPSYNC_DRY_RUN=False,
+    LDAPSYNC_USERS_BASE_DN="ou=users,dc=example,dc=org",
+    LDAPSYNC_GROUPS_BASE_DN="ou=groups,dc=example,dc=org",
+)
+class QueueTestCase(TestCase):
+    def setUp(self):
+        server = ldap3.Server("mock")
+        self.connection = ldap3.Connection(server, client_strategy=ldap3.MOCK_SYNC)
+        self.connection.bind()
+        patcher = mock.patch.object(pool, "connect", lambda: self.connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(pool.reset)
+
+    def test_coalesce(self):
+        user = get_user_model().objects.create(username="alice", email="a@example.org")
+        group = Group.objects.create(name="members")
+        for i in range(3):
+            user.first_name = f"Alice {i}"
+            user.save()
+            group.user_set.add(user)
+        self.assertEqual(PendingSync.objects.count(), 2)
+
+        self.assertEqual(queue.process(), 2)
+        self.assertFalse(PendingSync.objects.exists())
+        self.connection.search(
+            "uid=alice,ou=users,dc=example,dc=org",
+            "(objectClass=*)",
+            search_scope=ldap3.BASE,
+            attributes=["cn"],
+        )
+        self.assertEqual(self.connection.entries[0].cn.value, "Alice 2")
+        self.connection.search(
+            "cn=members,ou=groups,dc=example,dc=org",
+            "(objectClass=*)",
+            search_scope=ldap3.BASE,
+            attributes=["member"],
+        )
+        self.assertEqual(
+            self.connection.entries[0].member.value,
+            "uid=alice,ou=users,dc=example,dc=org",
+        )
+
+    def test_requeued_while_syncing(self):
+        user = get_user_model().objects.create(username="bob")
+        item = PendingSync.objects.get()
+
+        def sync_entry(*args):
+            queue.enqueue_users([user.pk])
+
+        with mock.patch.object(LDAP, "sync_entry", sync_entry):
+            queue.process()
+        self.assertGreater(PendingSync.objects.get().queued, item.queued)
+
+    def test_ldap_error(self):
+        get_user_model().objects.create(username="alice")
+        get_user_model().objects.create(username="bob")
+
+        with mock.patch.object(
+            LDAP, "sync_entry", side_effect=LDAPSocketSendError()
+        ) as sync_entry:
+            with self.assertRaises(LDAPSocketSendError):
+                queue.process()
+        # the batch stopped, and the connection wasn't returned to the pool
+        self.assertEqual(sync_entry.call_count, 1)
+        self.assertTrue(self.connection.closed)
+        self.assertEqual(pool.idle, [])
+        self.assertEqual(
+            sorted(PendingSync.objects.values_list("attempts", flat=True)), [0, 1]
+        )
+
+    @override_settings(LDAPSYNC_QUEUE_RETRIES=2, LDAPSYNC_QUEUE_RETRY_DELAY=60)
+    def test_retries(self):
+        get_user_model().objects.create(username="alice")
+
+        with mock.patch.object(LDAP, "sync_entry", side_effect=RuntimeError()):
+            with self.assertLogs("ldapsync.queue"):
+                self.assertEqual(queue.process(), 1)
+            item = PendingSync.objects.get()
+            self.assertEqual(item.attempts, 1)
+            # waiting for its retry
+            self.assertEqual(queue.process(), 0)
+
+            PendingSync.objects.update(queued=timezone.now())
+            with self.assertLogs("ldapsync.queue", "ERROR"):
+                self.assertEqual(queue.process(), 1)
+        self.assertFalse(PendingSync.objects.exists())
+
+
+@override_settings(
+    LDAPSYNC_QUEUE=True,
+    LDAPSYNC_DRY_RUN=False,
+    LDAPSYNC_USERS_BASE_DN="ou=users,dc=example,dc=org",
+    LDAPSYNC_GROUPS_BASE_DN="ou=groups,dc=example,dc=org",
+)
+class FullSyncTestCase(TestCase):
+    def setUp(self):
+        server = ldap3.Server("mock")
+        self.connection = ldap3.Connection(server, client_strategy=ldap3.MOCK_SYNC)
+        self.connection.bind()
+        for ou in ["users", "groups"]:
+            self.connection.strategy.add_entry(
+                f"ou={ou},dc=example,dc=org",
+                {"objectClass": ["organizationalUnit"], "ou": ou},
+            )
+        self.connection.strategy.add_entry(
+            "uid=carol,ou=users,dc=example,dc=org",
+            {"objectClass": ["account"], "uid": "carol"},
+        )
+        self.connection.strategy.add_entry(
+            "uid=alice,ou=Users,dc=example,dc=org",
+            {
+                "objectClass": ["top", "account", "extensibleObject"],
+                "uid": "alice",
+                "mail": "old@example.org",
+                "cn": "alice",
+            },
+        )
+        patcher = mock.patch.object(pool, "connect", lambda: self.connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(pool.reset)
+
+    def dns(self, base_dn):
+        self.connection.search(base_dn, "(objectClass=*)", attributes=["mail"])
+        return {entry.entry_dn.lower(): entry for entry in self.connection.entries}
+
+    def test_full(self):
+        get_user_model().objects.create(username="alice", email="a@example.org")
+        get_user_model().objects.create(username="bob", email="b@example.org")
+
+        with mock.patch.object(
+            self.connection, "search", wraps=self.connection.search
+        ) as search:
+            call_command("ldapsync_full")
+        self.assertEqual(search.call_count, 2)
+
+        users = self.dns("ou=users,dc=example,dc=org")
+        self.assertEqual(
+            set(users),
+            {
+                "ou=users,dc=example,dc=org",
+                "uid=alice,ou=users,dc=example,dc=org",
+                "uid=bob,ou=users,dc=example,dc=org",
+            },
+        )
+        self.assertEqual(
+            users["uid=alice,ou=users,dc=example,dc=org"].mail.value, "a@example.org"
+        )
+
+    def test_digests(self):
+        alice = get_user_model().objects.create(username="alice", email="a@example.org")
+        bob = get_user_model().objects.create(username="bob", email="b@example.org")
+        call_command("ldapsync_full")
+        self.assertEqual(LDAPEntryHash.objects.count(), 2)
+
+        with mock.patch.object(
+            self.connection, "search", wraps=self.connection.search
+        ) as search:
+            call_command("ldapsync_full")
+        self.assertEqual(search.call_count, 0)
+
+        # only the changed entry is read
+        alice.email = "alice@example.org"
+        alice.save()
+        bob.delete()
+        with mock.patch.object(
+            self.connection, "search", wraps=self.connection.search
+        ) as search:
+            call_command("ldapsync_full")
+        self.assertEqual(search.call_count, 1)
+        users = self.dns("ou=users,dc=example,dc=org")
+        self.assertEqual(
+            users["uid=alice,ou=users,dc=example,dc=org"].mail.value,
+            "alice@example.org",
+        )
+        self.assertNotIn("uid=bob,ou=users,dc=example,dc=org", users)
+
+        # changes made directly in the directory are found by --verify
+        self.connection.modify(
+            "uid=alice,ou=users,dc=example,dc=org",
+            {"mail": [(ldap3.MODIFY_REPLACE, ["other@example.org"])]},
+        )
+        call_command("ldapsync_full")
+        users = self.dns("ou=users,dc=example,dc=org")
+        self.assertEqual(
+            users["uid=alice,ou=users,dc=example,dc=org"].mail.value,
+            "other@example.org",
+        )
+        call_command("ldapsync_full", verify=True)
+        users = self.dns("ou=users,dc=example,dc=org")
+        self.assertEqual(
+            users["uid=alice,ou=users,dc=example,dc=org"].mail.value,
+            "alice@example.org",
+        )
+
+
+@override_settings(LDAPSYNC_QUEUE=True)
+class SerializersTestCase(TestCase):
+    def setUp(self):
+        group = Group.objects.create(name="members")
+        for name in ["alice", "bob", "carol"]:
+            user = get_user_model().objects.create(username=name)
+            user.sshkey_set.create(key=f"ssh-ed25519 AAAA {name}")
+            user.sshkey_set.create(key=f"ssh-ed25519 BBBB {name}", enabled=False)
+            user.nfctokens.create(uid=name.encode().hex(), enabled=True)
+            group.user_set.add(user)
+
+    def test_constant_queries(self):
+        users = get_user_model().objects.order_by("pk")
+        groups = Group.objects.order_by("pk")
+        expected_users = [
+            serializers.serialize_user(user, "ou=users") for user in users
+        ]
+        expected_groups = [
+            serializers.serialize_group(group, "ou=groups", "ou=users")
+            for group in groups
+        ]
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                list(serializers.serialize_users(users, "ou=users")), expected_users
+            )
+        with self.assertNumQueries(2):
+            self.assertEqual(
+                list(serializers.serialize_groups(groups, "ou=groups", "ou=users")),
+                expected_groups,
+            )
+        self.assertEqual(len(expected_users[0][1]["sshPublicKey"]), 1)
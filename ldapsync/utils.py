@@ -2,13 +2,20 @@
 #
 # SPDX-License-Identifier: MIT
 
+import hashlib
+import json
 from typing import OrderedDict
 
 import ldap3
 import ssl
 from django.conf import settings
+from ldap3.core.exceptions import LDAPInvalidDnError
+from ldap3.core.results import RESULT_NO_SUCH_OBJECT
+from ldap3.utils.dn import parse_dn
 
 from . import serializers
+from .models import LDAPEntryHash
+from .pool import ConnectionPool
 
 
 def normalise_entry(entry):
@@ -26,6 +33,32 @@ def normalise_entry(entry):
     return output
 
 
+def normalise_dn(dn):
+    # attribute types and values compared case-insensitively
+    try:
+        return ",".join(
+            f"{attr.lower()}={value.lower()}" for attr, value, separator in parse_dn(dn)
+        )
+    except LDAPInvalidDnError:
+        return dn.lower()
+
+
+def entry_digest(entry):
+    # stable hash of a serialized entry, "" for an entry that shouldn't exist
+    if entry is None:
+        return ""
+    canonical = [
+        [
+            attr,
+            [["b", v.hex()] if isinstance(v, bytes) else ["s", str(v)] for v in values],
+        ]
+        for attr, values in sorted(normalise_entry(entry).items())
+    ]
+    return hashlib.sha256(
+        json.dumps(canonical, separators=(",", ":")).encode()
+    ).hexdigest()
+
+
 def modlist(old, new, ignore_attr_types=[], debug=False):
     mods = {}
     seen_attr = {}
@@ -60,13 +93,15 @@ def modlist(old, new, ignore_attr_types=[], debug=False):
     return mods
 
 
-def sync_user(user, dry_run=False):
+def sync_user(user, dry_run=False, server=None):
     if not settings.LDAPSYNC_USERS_BASE_DN:
         return
+    if server is None:
+        with pool.connection() as connection:
+            return sync_user(user, server=LDAP(dry_run=dry_run, connection=connection))
     dn, entry = serializers.serialize_user(
         user, settings.LDAPSYNC_USERS_BASE_DN, domain_sid=settings.LDAPSYNC_DOMAIN_SID
     )
-    server = LDAP(dry_run=dry_run)
     server.sync_entry(dn, entry)
     if settings.LDAPSYNC_POSIX_GROUPS_BASE_DN:
         dn, entry = serializers.serialize_posixuser_group(
@@ -75,9 +110,14 @@ def sync_user(user, dry_run=False):
         server.sync_entry(dn, entry)
 
 
-def sync_group(group, dry_run=False):
+def sync_group(group, dry_run=False, server=None):
     if not settings.LDAPSYNC_GROUPS_BASE_DN:
         return
+    if server is None:
+        with pool.connection() as connection:
+            return sync_group(
+                group, server=LDAP(dry_run=dry_run, connection=connection)
+            )
     dn, entry = serializers.serialize_group(
         group,
         settings.LDAPSYNC_GROUPS_BASE_DN,
@@ -87,7 +127,6 @@ def sync_group(group, dry_run=False):
         posix_dn, posix_entry = serializers.serialize_posixgroup(
             group, settings.LDAPSYNC_POSIX_GROUPS_BASE_DN
         )
-    server = LDAP(dry_run=dry_run)
     server.sync_entry(dn, entry)
     if settings.LDAPSYNC_POSIX_GROUPS_BASE_DN and group.posix:
         server.sync_entry(posix_dn, posix_entry)
@@ -103,30 +142,104 @@ def ldap_connection():
         port=settings.LDAPSYNC_PORT,
         use_ssl=settings.LDAPSYNC_USE_SSL,
         tls=tls,
+        connect_timeout=settings.LDAPSYNC_TIMEOUT,
     )
     connection = ldap3.Connection(
         server,
         user=settings.LDAPSYNC_USER,
         password=settings.LDAPSYNC_PASSWORD,
         auto_bind=True,
+        receive_timeout=settings.LDAPSYNC_TIMEOUT,
     )
     return connection
 
 
+# plain sync connections with timeouts, so that an unreachable server fails
+# the request quickly; the pool checks idle connections and drops any that
+# raise an LDAP error
+pool = ConnectionPool(ldap_connection)
+
+
 class LDAP:
-    def __init__(self, debug=False, dry_run=False):
+    def __init__(self, debug=False, dry_run=False, connection=None, verify=False):
         self.debug = debug
         self.dry_run = dry_run
+        # read entries even if their digest shows no change since last time
+        self.verify = verify
         if settings.LDAPSYNC_DRY_RUN:
             self.dry_run = True
-        self.connection = ldap_connection()
+        if connection is None:
+            connection = ldap_connection()
+        self.connection = connection
         self.seen = {}
+        # entries read by load(), {base dn: {dn: (dn, attributes)}}, with
+        # normalised dns as keys
+        self.index = {}
+        # {dn: digest} from load_digests(), otherwise looked up per entry
+        self.digests = None
 
-    def sync_entry(self, dn, entry):
-        if self.debug:
-            print(f"--- {dn} ---")
-            print(entry)
-        self.seen[dn] = True
+    def load_digests(self):
+        self.digests = dict(LDAPEntryHash.objects.values_list("dn", "digest"))
+
+    def stored_digest(self, key):
+        if self.digests is not None:
+            return self.digests.get(key)
+        return (
+            LDAPEntryHash.objects.filter(dn=key)
+            .values_list("digest", flat=True)
+            .first()
+        )
+
+    def record_digest(self, key, digest):
+        LDAPEntryHash.objects.update_or_create(dn=key, defaults={"digest": digest})
+        if self.digests is not None:
+            self.digests[key] = digest
+
+    def forget_digest(self, key):
+        LDAPEntryHash.objects.filter(dn=key).delete()
+        if self.digests is not None:
+            self.digests.pop(key, None)
+
+    def delete(self, dn):
+        # True once the entry is gone
+        return (
+            self.connection.delete(dn)
+            or self.connection.result.get("result") == RESULT_NO_SUCH_OBJECT
+        )
+
+    def load(self, base_dn):
+        # read everything under base_dn with one paged search, so that
+        # sync_entry() and auto_delete() don't have to search for them
+        entries = {}
+        for response in self.connection.extend.standard.paged_search(
+            search_base=base_dn,
+            search_filter="(objectClass=*)",
+            search_scope=ldap3.SUBTREE,
+            attributes="*",
+            paged_size=settings.LDAPSYNC_PAGE_SIZE,
+            generator=True,
+        ):
+            if response["type"] != "searchResEntry":
+                continue
+            entries[normalise_dn(response["dn"])] = (
+                response["dn"],
+                normalise_entry(response["attributes"]),
+            )
+        self.index[normalise_dn(base_dn)] = entries
+
+    def indexed_base(self, dn):
+        # the loaded base dn that dn belongs under, if any
+        key = normalise_dn(dn)
+        for base in self.index:
+            if key == base or key.endswith("," + base):
+                return base
+        return None
+
+    def read_entry(self, dn):
+        base = self.indexed_base(dn)
+        if base is not None:
+            found = self.index[base].get(normalise_dn(dn))
+            return found and found[1]
         self.connection.search(
             search_base=dn,
             search_filter="(objectClass=*)",
@@ -134,13 +247,38 @@ class LDAP:
             attributes="*",
         )
         if len(self.connection.response) == 1:
-            old_entry = normalise_entry(self.connection.response[0]["attributes"])
+            return normalise_entry(self.connection.response[0]["attributes"])
+        return None
+
+    def update_index(self, dn, entry):
+        base = self.indexed_base(dn)
+        if base is None:
+            return
+        if entry is None:
+            self.index[base].pop(normalise_dn(dn), None)
+        else:
+            self.index[base][normalise_dn(dn)] = (dn, normalise_entry(entry))
+
+    def sync_entry(self, dn, entry):
+        if self.debug:
+            print(f"--- {dn} ---")
+            print(entry)
+        key = normalise_dn(dn)
+        self.seen[key] = True
+        digest = entry_digest(entry)
+        if not self.verify and self.stored_digest(key) == digest:
+            if self.debug:
+                print(f"NO CHANGE SINCE LAST SYNC {dn}")
+            return
+        written = True
+        old_entry = self.read_entry(dn)
+        if old_entry is not None:
             if entry is None:
                 # server entry should be deleted
                 if self.debug:
                     print(f"DELETE {dn}")
                 if not self.dry_run:
-                    self.connection.delete(dn)
+                    written = self.delete(dn)
                     if self.debug:
                         print(self.connection.result)
             else:
@@ -149,7 +287,7 @@ class LDAP:
                     if self.debug:
                         print(f"CHANGES {dn} {mods}")
                     if not self.dry_run:
-                        self.connection.modify(dn, mods)
+                        written = self.connection.modify(dn, mods)
                         if self.debug:
                             print(self.connection.result)
                 else:
@@ -163,27 +301,55 @@ class LDAP:
                 if self.debug:
                     print(f"ADD {dn}")
                 if not self.dry_run:
-                    self.connection.add(dn, attributes=entry)
+                    written = self.connection.add(dn, attributes=entry)
                     if self.debug:
                         print(self.connection.result)
+        if written and not self.dry_run:
+            self.update_index(dn, entry)
+            self.record_digest(key, digest)
 
     def auto_delete(self, base_dn):
-        self.connection.search(
-            search_base=base_dn,
-            search_filter="(objectClass=*)",
-            search_scope=ldap3.SUBTREE,
-            attributes=[],
-        )
-        if len(self.connection.response) > 0:
-            for response in self.connection.response:
-                dn = response["dn"]
-                if dn == base_dn:
-                    continue
-                if dn in self.seen:
-                    continue
-                if not self.dry_run:
-                    if self.debug:
-                        print(f"DELETE {dn}")
-                    self.connection.delete(dn)
-                    if self.debug:
-                        print(self.connection.result)
+        base = normalise_dn(base_dn)
+        if base in self.index:
+            dns = [dn for dn, attributes in self.index[base].values()]
+        elif self.digests is not None and not self.verify:
+            # entries written by earlier syncs, entries added to the
+            # directory by other means are left for a verifying sync
+            dns = [
+                key
+                for key, digest in self.digests.items()
+                if digest and key.endswith("," + base)
+            ]
+        else:
+            self.connection.search(
+                search_base=base_dn,
+                search_filter="(objectClass=*)",
+                search_scope=ldap3.SUBTREE,
+                attributes=[],
+            )
+            dns = [response["dn"] for response in self.connection.response]
+        for dn in dns:
+            key = normalise_dn(dn)
+            if key == base:
+                continue
+            if key in self.seen:
+                continue
+            if not self.dry_run:
+                if self.debug:
+                    print(f"DELETE {dn}")
+                deleted = self.delete(dn)
+                if self.debug:
+                    print(self.connection.result)
+                if deleted:
+                    self.update_index(dn, None)
+                    self.forget_digest(key)
+        if base in self.index and self.digests is not None and not self.dry_run:
+            # digests of entries that are neither wanted nor in the directory
+            for key in [
+                key
+                for key in self.digests
+                if key.endswith("," + base)
+                and key not in self.seen
+                and key not in self.index[base]
+            ]:
+                self.forget_digest(key)
@@ -8,7 +8,8 @@ from django.contrib import admin
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 
-from .models import NFCToken, NFCTokenLog
+from . import search
+from .models import Location, NFCToken, NFCTokenLog, NFCTokenUsage
 
 
 class RecentDaysListFilter(admin.SimpleListFilter):
@@ -49,13 +50,14 @@ class NFCTokenAdmin(admin.ModelAdmin):
         "last_location",
     )
     list_display_links = ("uid",)
+    list_select_related = ("user", "last_location")
     ordering = (
         "user",
         "-last_seen",
     )
     search_fields = (
         "uid",
-        "last_location",
+        "last_location__name",
         "user__username",
         "user__first_name",
         "user__last_name",
@@ -78,12 +80,13 @@ class NFCTokenLogAdmin(admin.ModelAdmin):
         "authorized",
     )
     list_display_links = None
+    list_select_related = ("location", "token", "user")
     list_filter = ("location", "authorized", "ltype", RecentDaysListFilter)
     actions = None
     ordering = ("-timestamp",)
     search_fields = (
         "uid",
-        "location",
+        "location__name",
         "name",
         "username",
         "token_description",
@@ -92,6 +95,13 @@ class NFCTokenLogAdmin(admin.ModelAdmin):
         "user__last_name",
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # the full-text index covers the log's own columns, user names are
+        # copied into the log when it is written
+        if not search.available() or not search.search_terms(search_term):
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(search.matches(search_term)), False
+
     def token_link(self, obj):
         if obj.token:
             return mark_safe(
@@ -119,6 +129,43 @@ class NFCTokenLogAdmin(admin.ModelAdmin):
     user_link.short_description = "user"
 
 
+@admin.register(NFCTokenUsage)
+class NFCTokenUsageAdmin(admin.ModelAdmin):
+    list_display = (
+        "day",
+        "location",
+        "user",
+        "ltype",
+        "authorized",
+        "count",
+        "first_seen",
+        "last_seen",
+    )
+    list_display_links = None
+    list_select_related = ("location", "user")
+    list_filter = ("location", "authorized", "ltype")
+    actions = None
+    date_hierarchy = "day"
+    ordering = ("-day", "location__name")
+    search_fields = (
+        "location__name",
+        "user__username",
+        "user__first_name",
+        "user__last_name",
+    )
+
+
+@admin.register(Location)
+class LocationAdmin(admin.ModelAdmin):
+    list_display = ("name", "first_seen")
+    ordering = ("name",)
+    search_fields = ("name",)
+
+    def has_add_permission(self, request):
+        # registered by the first sighting
+        return False
+
+
 class NFCTokenInline(admin.TabularInline):
     model = NFCToken
     fields = ("uid", "description", "last_seen", "last_location", "enabled")
@@ -8,3 +8,6 @@ from django.apps import AppConfig
 class NfcTokensConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "nfctokens"
+
+    def ready(self):
+        from . import receivers
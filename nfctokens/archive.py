@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Archive of expired NFCTokenLog rows as gzip-compressed JSON lines, one
+# file per local day:
+#
+#   <directory>/<yyyy>/<mm>/nfctokenlog-<yyyy-mm-dd>.jsonl.gz
+#
+# Each batch is appended as a separate gzip member, which gzip readers treat
+# as one stream. If the process stops between writing a batch and deleting
+# it, the next run archives those rows again; rows keep their log id so
+# duplicates can be told apart.
+
+import datetime
+import gzip
+import json
+import os
+from pathlib import Path
+
+from django.utils import timezone
+
+FILENAME_PREFIX = "nfctokenlog-"
+FILENAME_SUFFIX = ".jsonl.gz"
+
+
+def archive_path(directory, day):
+    return (
+        Path(directory)
+        / f"{day:%Y}"
+        / f"{day:%m}"
+        / f"{FILENAME_PREFIX}{day.isoformat()}{FILENAME_SUFFIX}"
+    )
+
+
+def log_record(log):
+    return {
+        "id": log.pk,
+        "timestamp": log.timestamp.isoformat(),
+        "ltype": log.ltype,
+        "uid": log.uid,
+        "location": log.location.name if log.location_id else "",
+        "authorized": log.authorized,
+        "user_id": log.user_id,
+        "username": log.username,
+        "name": log.name,
+        "token_id": log.token_id,
+        "token_description": log.token_description,
+    }
+
+
+def write_logs(directory, logs):
+    # append logs to their daily files and flush them to disk, returns the
+    # number of rows written
+    days = {}
+    for log in logs:
+        day = timezone.localdate(log.timestamp)
+        days.setdefault(day, []).append(json.dumps(log_record(log)) + "\n")
+    for day, lines in sorted(days.items()):
+        path = archive_path(directory, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "ab") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb") as gz:
+                gz.write("".join(lines).encode())
+            f.flush()
+            os.fsync(f.fileno())
+    return sum(len(lines) for lines in days.values())
+
+
+def archive_files(directory, first_day=None, last_day=None):
+    # daily files in date order, skipping files outside the range by name
+    for path in sorted(
+        Path(directory).glob(f"*/*/{FILENAME_PREFIX}*{FILENAME_SUFFIX}")
+    ):
+        name = path.name[len(FILENAME_PREFIX) : -len(FILENAME_SUFFIX)]
+        try:
+            day = datetime.date.fromisoformat(name)
+        except ValueError:
+            continue
+        if first_day and day < first_day:
+            continue
+        if last_day and day > last_day:
+            continue
+        yield path
+
+
+def read_logs(directory, first_day=None, last_day=None, locations=None):
+    # stream archived rows one line at a time
+    for path in archive_files(directory, first_day, last_day):
+        with gzip.open(path, "rt") as f:
+            for line in f:
+                record = json.loads(line)
+                if locations and record["location"] not in locations:
+                    continue
+                yield record
@@ -0,0 +1,116 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Compact binary form of the nfc_tokens export for door controllers.
+#
+# All integers are little-endian.
+#
+#   header      magic "HDBT", u16 format (1), u16 bitmap size in bytes,
+#               u64 generation, u32 groups, u32 bitmaps, u32 tokens
+#   groups      per group: u16 length, UTF-8 name
+#   bitmaps     fixed size; bit n (LSB first) set = member of group n
+#   tokens      16 bytes each: u8 UID length in bytes, UID zero-padded to
+#               10 bytes, pad byte, u32 index into the bitmap table
+#
+# Token records are sorted by their first 11 bytes (length, padded UID),
+# so a controller can binary search the table in place.
+
+import struct
+
+from django.core.cache import cache
+
+from . import export
+
+MAGIC = b"HDBT"
+FORMAT = 1
+HEADER = struct.Struct("<4sHHQIII")
+GROUP_NAME = struct.Struct("<H")
+TOKEN = struct.Struct("<B10sxI")
+UID_BYTES = 10
+
+
+def token_key(uid):
+    raw = bytes.fromhex(uid)
+    return bytes([len(raw)]) + raw.ljust(UID_BYTES, b"\0")
+
+
+def build_bundle(data, generation):
+    groups = sorted({group for user in data.values() for group in user["groups"]})
+    group_bits = {group: n for n, group in enumerate(groups)}
+    bitmap_size = (len(groups) + 7) // 8
+
+    bitmaps = {}
+    records = []
+    for user in data.values():
+        mask = 0
+        for group in user["groups"]:
+            mask |= 1 << group_bits[group]
+        bitmap = bitmaps.setdefault(mask, len(bitmaps))
+        for uid in user["tokens"]:
+            try:
+                key = token_key(uid)
+            except ValueError:
+                continue
+            if len(key) != UID_BYTES + 1:
+                continue
+            records.append((key, bitmap))
+    records.sort()
+
+    output = [
+        HEADER.pack(
+            MAGIC,
+            FORMAT,
+            bitmap_size,
+            generation,
+            len(groups),
+            len(bitmaps),
+            len(records),
+        )
+    ]
+    for group in groups:
+        name = group.encode()
+        output.append(GROUP_NAME.pack(len(name)) + name)
+    for mask in bitmaps:
+        output.append(mask.to_bytes(bitmap_size, "little"))
+    for key, bitmap in records:
+        output.append(TOKEN.pack(key[0], key[1:], bitmap))
+    return b"".join(output)
+
+
+def read_bundle(bundle):
+    # returns (generation, {uid: [groups]})
+    magic, format_, bitmap_size, generation, group_count, bitmap_count, count = (
+        HEADER.unpack_from(bundle)
+    )
+    if magic != MAGIC or format_ != FORMAT:
+        raise ValueError("Not a token bundle")
+    offset = HEADER.size
+    groups = []
+    for n in range(group_count):
+        (length,) = GROUP_NAME.unpack_from(bundle, offset)
+        offset += GROUP_NAME.size
+        groups.append(bundle[offset : offset + length].decode())
+        offset += length
+    bitmaps = []
+    for n in range(bitmap_count):
+        mask = int.from_bytes(bundle[offset : offset + bitmap_size], "little")
+        bitmaps.append([group for i, group in enumerate(groups) if mask & (1 << i)])
+        offset += bitmap_size
+    tokens = {}
+    for n in range(count):
+        length, uid, bitmap = TOKEN.unpack_from(bundle, offset)
+        tokens[uid[:length].hex()] = bitmaps[bitmap]
+        offset += TOKEN.size
+    return generation, tokens
+
+
+def get_bundle():
+    # returns (generation, bundle), cached until the export version changes
+    generation = export.current_version()
+    key = f"nfctokens.bundle.{generation}"
+    bundle = cache.get(key)
+    if bundle is None:
+        bundle = build_bundle(export.export_all(), generation)
+        cache.set(key, bundle, timeout=86400)
+    return generation, bundle
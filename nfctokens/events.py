@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Server-sent events for controllers that keep a local copy of the
+# nfc_tokens export. Event ids are export versions, so a reconnect with
+# Last-Event-ID (or ?since=) resumes where the stream left off.
+#
+#   version   {"version": n}, sent first when no version was given
+#   user      {"user": key, "groups": [...], "tokens": [...]}
+#   delete    {"user": key}, nothing left to export for this user
+#   resync    {"version": n}, the version given is unknown or expired,
+#             fetch nfc_tokens in full and reconnect with its version
+
+import asyncio
+import json
+import time
+
+from django.conf import settings
+
+from . import export
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def change_events(changes):
+    users = await export.aexport_users(export.changed_users(changes.keys()))
+    for key, change_id in changes.items():
+        if key in users:
+            yield format_event("user", {"user": key, **users[key]}, change_id)
+        else:
+            yield format_event("delete", {"user": key}, change_id)
+
+
+async def stream(since=None):
+    yield f"retry: {settings.NFCTOKENS_EVENTS_RETRY * 1000}\n\n"
+    if since is None:
+        since = await export.acurrent_version()
+        yield format_event("version", {"version": since}, since)
+
+    started = last_sent = time.monotonic()
+    while True:
+        version, changes = await export.achanges_since(since)
+        if changes is None:
+            yield format_event("resync", {"version": version})
+            return
+        if changes:
+            async for event in change_events(changes):
+                yield event
+            since = max(changes.values())
+            last_sent = time.monotonic()
+        elif time.monotonic() - last_sent >= settings.NFCTOKENS_EVENTS_HEARTBEAT:
+            yield ": keepalive\n\n"
+            last_sent = time.monotonic()
+
+        # end long-lived streams now and then, the client reconnects
+        if time.monotonic() - started >= settings.NFCTOKENS_EVENTS_MAX_AGE:
+            return
+        await asyncio.sleep(settings.NFCTOKENS_EVENTS_POLL_INTERVAL)
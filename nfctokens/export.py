@@ -0,0 +1,146 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Min, Prefetch, Q
+
+from hackdb import groupmasks
+
+from .models import NFCToken, NFCTokenChange
+
+
+def export_key(user):
+    return user.username or user.email
+
+
+def active_users(users):
+    return users.filter(is_active=True).prefetch_related(
+        Prefetch("nfctokens", queryset=NFCToken.objects.filter(enabled=True)),
+    )
+
+
+def build_export(users, masks):
+    data = {}
+    for user in users:
+        groups = groupmasks.index.group_list(masks.get(user.pk, 0))
+        tokens = sorted(token.uid for token in user.nfctokens.all())
+        if len(groups) > 0 and len(tokens) > 0:
+            data[export_key(user)] = {
+                "groups": groups,
+                "tokens": tokens,
+            }
+    return data
+
+
+def export_users(users):
+    users = active_users(users)
+    masks = groupmasks.user_masks(users.values("pk"))
+    groupmasks.index.refresh()
+    return build_export(users, masks)
+
+
+async def aexport_users(users):
+    users = active_users(users)
+    masks = await groupmasks.auser_masks(users.values("pk"))
+    await groupmasks.index.arefresh()
+    return build_export([user async for user in users], masks)
+
+
+def export_all():
+    return export_users(get_user_model().objects.all())
+
+
+async def aexport_all():
+    return await aexport_users(get_user_model().objects.all())
+
+
+def changed_users(keys):
+    return get_user_model().objects.filter(
+        Q(username__in=keys) | Q(username="", email__in=keys)
+    )
+
+
+def current_version():
+    return NFCTokenChange.objects.aggregate(n=Max("id"))["n"] or 0
+
+
+async def acurrent_version():
+    return (await NFCTokenChange.objects.aaggregate(n=Max("id")))["n"] or 0
+
+
+def export_since(since):
+    # returns (version, full, users, deleted)
+    version = current_version()
+    oldest = NFCTokenChange.objects.aggregate(n=Min("id"))["n"] or version + 1
+    if since > version or since < oldest - 1:
+        # unknown version, or the changes have already been expired
+        return version, True, export_all(), []
+
+    keys = set(
+        NFCTokenChange.objects.filter(id__gt=since).values_list("username", flat=True)
+    )
+    users = export_users(changed_users(keys))
+    return version, False, users, sorted(keys - users.keys())
+
+
+async def aexport_since(since):
+    version = await acurrent_version()
+    oldest = (await NFCTokenChange.objects.aaggregate(n=Min("id")))["n"] or version + 1
+    if since > version or since < oldest - 1:
+        return version, True, await aexport_all(), []
+
+    keys = {
+        key
+        async for key in NFCTokenChange.objects.filter(id__gt=since).values_list(
+            "username", flat=True
+        )
+    }
+    users = await aexport_users(changed_users(keys))
+    return version, False, users, sorted(keys - users.keys())
+
+
+async def achanges_since(since):
+    # returns (version, {key: latest change id}), or (version, None) if since
+    # is unknown or has been expired
+    version = await acurrent_version()
+    oldest = (await NFCTokenChange.objects.aaggregate(n=Min("id")))["n"] or version + 1
+    if since > version or since < oldest - 1:
+        return version, None
+    changes = {}
+    async for key, change_id in (
+        NFCTokenChange.objects.filter(id__gt=since)
+        .values("username")
+        .annotate(latest=Max("id"))
+        .order_by("latest")
+        .values_list("username", "latest")
+    ):
+        changes[key] = change_id
+    return version, changes
+
+
+def record_keys(keys):
+    keys = set(keys) - {""}
+    if keys:
+        transaction.on_commit(
+            lambda: NFCTokenChange.objects.bulk_create(
+                NFCTokenChange(username=key) for key in sorted(keys)
+            )
+        )
+
+
+def record_users(user_ids):
+    user_ids = set(user_ids) - {None}
+    if not user_ids:
+        return
+
+    def record():
+        NFCTokenChange.objects.bulk_create(
+            NFCTokenChange(username=export_key(user))
+            for user in get_user_model()
+            .objects.filter(pk__in=user_ids)
+            .only("username", "email")
+        )
+
+    transaction.on_commit(record)
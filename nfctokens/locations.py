@@ -0,0 +1,68 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Controllers send locations as strings. They are stored as references to
+# Location rows, registered the first time a name is seen, with the
+# name -> id mapping kept in memory.
+
+import threading
+
+from django.db import transaction
+
+from hackdb.versions import bump_version, get_version
+
+from .models import Location
+
+VERSION_KEY = "nfctokens.locations_version"
+CACHE_SIZE = 4096
+
+
+class LocationCache:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.ids = {}
+
+    def resolve(self, names):
+        # {name: id} for the given names, empty names are left out
+        version = get_version(VERSION_KEY)
+        if version != self.version:
+            with self.lock:
+                self.ids = {}
+                self.version = version
+        ids = self.ids
+
+        found = {name: ids[name] for name in names if name in ids}
+        missing = set(names) - found.keys() - {"", None}
+        if missing:
+            Location.objects.bulk_create(
+                (Location(name=name) for name in missing), ignore_conflicts=True
+            )
+            rows = dict(
+                Location.objects.filter(name__in=missing).values_list("name", "id")
+            )
+            # rows created here disappear again if the transaction rolls back
+            transaction.on_commit(lambda: self.remember(ids, rows))
+            found.update(rows)
+        return found
+
+    def remember(self, ids, rows):
+        with self.lock:
+            if len(ids) + len(rows) > CACHE_SIZE:
+                ids.clear()
+            ids.update(rows)
+
+    def invalidate(self):
+        bump_version(VERSION_KEY)
+
+
+cache = LocationCache()
+
+
+def location_id(name):
+    return cache.resolve([name]).get(name)
+
+
+def locations_changed():
+    transaction.on_commit(cache.invalidate)
@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import csv
+import datetime
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from nfctokens import archive
+
+FIELDS = [
+    "id",
+    "timestamp",
+    "ltype",
+    "uid",
+    "location",
+    "authorized",
+    "user_id",
+    "username",
+    "name",
+    "token_id",
+    "token_description",
+]
+
+
+class Command(BaseCommand):
+    help = "Read NFC token logs from the archive written by nfctokens_expire"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--archive-dir", type=str, default=settings.NFCTOKENS_ARCHIVE_DIR
+        )
+        parser.add_argument(
+            "--from", dest="first_day", type=datetime.date.fromisoformat
+        )
+        parser.add_argument("--to", dest="last_day", type=datetime.date.fromisoformat)
+        parser.add_argument("--location", type=str, action="append", help="Repeatable")
+        parser.add_argument("--user", type=str, help="Username")
+        parser.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+
+    def handle(self, *args, **options):
+        if not options["archive_dir"]:
+            raise CommandError("No archive directory, set NFCTOKENS_ARCHIVE_DIR")
+
+        records = archive.read_logs(
+            options["archive_dir"],
+            options["first_day"],
+            options["last_day"],
+            set(options["location"] or []),
+        )
+        if options["user"]:
+            records = (
+                record for record in records if record["username"] == options["user"]
+            )
+
+        if options["format"] == "csv":
+            writer = csv.DictWriter(self.stdout, fieldnames=FIELDS, lineterminator="\n")
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+        else:
+            for record in records:
+                self.stdout.write(json.dumps(record))
@@ -3,23 +3,87 @@
 # SPDX-License-Identifier: MIT
 
 import datetime
+import time
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max, Min
 from django.utils import timezone
 
-from nfctokens.models import NFCToken, NFCTokenLog
+from nfctokens import archive
+from nfctokens.export import current_version
+from nfctokens.models import NFCToken, NFCTokenChange, NFCTokenLog
 
 
 class Command(BaseCommand):
-    help = ""
+    help = "Delete expired NFC token logs and unclaimed tokens"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.NFCTOKENS_EXPIRE_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=settings.NFCTOKENS_EXPIRE_BATCH_PAUSE,
+            help="Seconds to wait between batches",
+        )
+        parser.add_argument(
+            "--archive-dir",
+            type=str,
+            default=settings.NFCTOKENS_ARCHIVE_DIR,
+            help="Write expired logs to compressed daily files here before deleting",
+        )
 
     def handle(self, *args, **options):
         if settings.NFCTOKENS_LOG_RETENTION_DAYS:
             delete_before_date = timezone.make_aware(
                 datetime.datetime.now()
             ) - datetime.timedelta(days=settings.NFCTOKENS_LOG_RETENTION_DAYS)
-            NFCTokenLog.objects.filter(timestamp__lt=delete_before_date).delete()
+            self.expire_logs(
+                delete_before_date,
+                options["batch_size"],
+                options["pause"],
+                options["verbosity"],
+                options["archive_dir"],
+            )
             NFCToken.objects.filter(
                 user=None, last_seen__lt=delete_before_date
             ).delete()
+            # keep the latest change so that the export version never goes back
+            NFCTokenChange.objects.filter(timestamp__lt=delete_before_date).exclude(
+                pk=current_version()
+            ).delete()
+
+    def expire_logs(
+        self, delete_before_date, batch_size, pause, verbosity, archive_dir=None
+    ):
+        # Delete in short transactions over id ranges so that door auth can
+        # get the write lock in between. Each run starts again from the lowest
+        # expired id, so an interrupted run just carries on where it stopped.
+        expired = NFCTokenLog.objects.filter(timestamp__lt=delete_before_date)
+        bounds = expired.aggregate(first=Min("id"), last=Max("id"))
+        if bounds["first"] is None:
+            return
+        total = 0
+        start = bounds["first"]
+        while start <= bounds["last"]:
+            end = start + batch_size
+            batch = expired.filter(id__gte=start, id__lt=end)
+            with transaction.atomic():
+                if archive_dir:
+                    # on disk before the rows go
+                    archive.write_logs(
+                        archive_dir,
+                        batch.select_related("location").order_by("id").iterator(),
+                    )
+                deleted, _ = batch.delete()
+            total += deleted
+            if verbosity > 1:
+                self.stdout.write(f"deleted {deleted} logs with ids {start}-{end - 1}")
+            start = end
+            if pause and start <= bounds["last"]:
+                time.sleep(pause)
+        if verbosity > 1:
+            self.stdout.write(f"deleted {total} logs before {delete_before_date}")
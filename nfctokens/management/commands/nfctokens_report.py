@@ -2,14 +2,29 @@
 #
 # SPDX-License-Identifier: MIT
 
+import csv
 import datetime
+import json
 
 import tabulate
 
 from django.contrib.auth import get_user_model
 from django.core.management.base import BaseCommand
+from django.db.models import Count, Max, Q, Sum
 from django.utils import timezone
 
+from nfctokens.models import NFCTokenUsage
+
+
+def window_label(days):
+    if days == 365:
+        return "1-year"
+    return f"{days}-days"
+
+
+def field_name(header):
+    return header.lower().replace("-", "_").replace(" ", "_")
+
 
 class Command(BaseCommand):
     help = "Per-user report of NFC Token assignment and usage"
@@ -17,44 +32,123 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--reverse", action="store_true")
         parser.add_argument("--sort", type=str, nargs=1)
+        parser.add_argument(
+            "--window",
+            type=int,
+            action="append",
+            help="Count tokens seen in the last N days (repeatable)",
+        )
+        parser.add_argument(
+            "--format", choices=["table", "csv", "json"], default="table"
+        )
+        parser.add_argument(
+            "--usage",
+            action="store_true",
+            help="Daily usage per location, from the usage totals",
+        )
+        parser.add_argument("--days", type=int, default=7)
+        parser.add_argument("--user", type=str)
 
     def handle(self, *args, **options):
-        last_1year = timezone.now() - datetime.timedelta(days=365)
-        last_90d = timezone.now() - datetime.timedelta(days=90)
-        last_30d = timezone.now() - datetime.timedelta(days=30)
-
-        headers = [
-            "Username",
-            "Name",
-            "Tokens",
-            "Enabled",
-            "1-year",
-            "90-days",
-            "30-days",
-        ]
-        output = []
-
-        for user in get_user_model().objects.all():
-            output.append(
-                [
+        if options["usage"]:
+            headers, rows = self.usage_report(options["days"], options["user"])
+        else:
+            headers, rows = self.user_report(
+                options["window"] or [365, 90, 30],
+                options["sort"][0] if options["sort"] else None,
+                options["reverse"],
+            )
+        self.output(headers, rows, options["format"])
+
+    def output(self, headers, rows, format_):
+        if format_ == "csv":
+            writer = csv.writer(self.stdout, lineterminator="\n")
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+        elif format_ == "json":
+            # one object per line
+            fields = [field_name(header) for header in headers]
+            for row in rows:
+                self.stdout.write(json.dumps(dict(zip(fields, row)), default=str))
+        else:
+            self.stdout.write(tabulate.tabulate(list(rows), headers=headers))
+
+    def user_report(self, windows, sort=None, reverse=False):
+        now = timezone.now()
+        annotations = {
+            "tokens": Count("nfctokens"),
+            "enabled": Count("nfctokens", filter=Q(nfctokens__enabled=True)),
+        }
+        for days in windows:
+            annotations[f"seen_{days}"] = Count(
+                "nfctokens",
+                filter=Q(
+                    nfctokens__enabled=True,
+                    nfctokens__last_seen__gt=now - datetime.timedelta(days=days),
+                ),
+            )
+
+        headers = ["Username", "Name", "Tokens", "Enabled"]
+        headers.extend(window_label(days) for days in windows)
+        ordering = {
+            "Username": ["username"],
+            "Name": ["first_name", "last_name"],
+            "Tokens": ["tokens"],
+            "Enabled": ["enabled"],
+        }
+        for days in windows:
+            ordering[window_label(days)] = [f"seen_{days}"]
+        order_by = ordering.get(sort, ["username"])
+        if reverse:
+            order_by = [f"-{field}" for field in order_by]
+
+        users = (
+            get_user_model()
+            .objects.only("username", "first_name", "last_name")
+            .annotate(**annotations)
+            .order_by(*order_by, "pk")
+        )
+
+        def rows():
+            for user in users.iterator():
+                row = [
                     user.username,
                     user.get_full_name(),
-                    user.nfctokens.count(),
-                    user.nfctokens.filter(enabled=True).count(),
-                    user.nfctokens.filter(
-                        enabled=True, last_seen__gt=last_1year
-                    ).count(),
-                    user.nfctokens.filter(enabled=True, last_seen__gt=last_90d).count(),
-                    user.nfctokens.filter(enabled=True, last_seen__gt=last_30d).count(),
+                    user.tokens,
+                    user.enabled,
                 ]
+                row.extend(getattr(user, f"seen_{days}") for days in windows)
+                yield row
+
+        return headers, rows()
+
+    def usage_report(self, days, username=None):
+        first_day = timezone.localdate() - datetime.timedelta(days=days - 1)
+        usage = NFCTokenUsage.objects.filter(day__gte=first_day)
+        if username:
+            usage = usage.filter(user__username=username)
+        usage = (
+            usage.values("day", "location__name")
+            .annotate(
+                taps=Sum("count"),
+                authorized=Sum("count", filter=Q(authorized=True)),
+                users=Count("user", distinct=True),
+                last_seen=Max("last_seen"),
             )
+            .order_by("-day", "location__name")
+        )
+        headers = ["Day", "Location", "Taps", "Authorized", "Users", "Last seen"]
 
-        try:
-            sort_column = headers.index(options["sort"][0])
-        except TypeError:
-            sort_column = 0
-        except ValueError:
-            sort_column = 0
-        output.sort(key=lambda row: row[sort_column], reverse=options["reverse"])
+        def rows():
+            for row in usage.iterator():
+                yield [
+                    row["day"],
+                    row["location__name"] or "",
+                    row["taps"],
+                    row["authorized"] or 0,
+                    row["users"],
+                    timezone.localtime(row["last_seen"]).strftime("%H:%M:%S"),
+                ]
 
-        print(tabulate.tabulate(output, headers=headers))
+        return headers, rows()
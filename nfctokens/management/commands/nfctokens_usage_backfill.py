@@ -0,0 +1,61 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from nfctokens.models import NFCTokenLog, NFCTokenUsage
+from nfctokens.rollups import rebuild_day
+
+
+class Command(BaseCommand):
+    help = "Recalculate daily NFC token usage from the logs that are still held"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--overwrite",
+            action="store_true",
+            help="Also recalculate days that already have usage totals",
+        )
+
+    def handle(self, *args, **options):
+        # the oldest day still in the logs has been partly expired, so its
+        # totals are only rebuilt if there are none at all
+        cutoff = None
+        if settings.NFCTOKENS_LOG_RETENTION_DAYS:
+            cutoff = timezone.localdate(
+                timezone.now()
+                - datetime.timedelta(days=settings.NFCTOKENS_LOG_RETENTION_DAYS)
+            )
+        logged = dict(
+            NFCTokenLog.objects.annotate(
+                day=TruncDate("timestamp", tzinfo=timezone.get_current_timezone())
+            )
+            .values("day")
+            .annotate(count=Count("id"))
+            .order_by()
+            .values_list("day", "count")
+        )
+        counted = dict(
+            NFCTokenUsage.objects.values("day")
+            .annotate(count=Sum("count"))
+            .order_by()
+            .values_list("day", "count")
+        )
+        for day in sorted(logged):
+            if day in counted:
+                if cutoff is not None and day <= cutoff:
+                    continue
+                # a day with fewer taps counted than logged, like the day the
+                # rollups were deployed, is rebuilt even without --overwrite
+                if not options["overwrite"] and counted[day] >= logged[day]:
+                    continue
+            rebuild_day(day)
+            if options["verbosity"] > 1:
+                self.stdout.write(f"rebuilt {day}")
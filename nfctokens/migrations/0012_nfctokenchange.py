@@ -0,0 +1,38 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0011_alter_nfctoken_uid"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NFCTokenChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "timestamp",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+                ("username", models.CharField(editable=False, max_length=255)),
+            ],
+            options={
+                "verbose_name": "NFC Token Change",
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0012_nfctokenchange"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="nfctokenlog",
+            index=models.Index(fields=["timestamp"], name="nfctokenlog_timestamp"),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0013_nfctokenlog_timestamp"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NFCTokenUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(editable=False)),
+                ("location", models.CharField(editable=False, max_length=255)),
+                (
+                    "authorized",
+                    models.BooleanField(blank=True, editable=False, null=True),
+                ),
+                (
+                    "ltype",
+                    models.CharField(
+                        editable=False, max_length=32, verbose_name="Type"
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0, editable=False)),
+                ("first_seen", models.DateTimeField(editable=False)),
+                ("last_seen", models.DateTimeField(editable=False)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        editable=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="nfctokenusage",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "NFC Token Usage",
+                "verbose_name_plural": "NFC Token Usage",
+                "unique_together": {("day", "location", "user", "authorized", "ltype")},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:57
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0014_nfctokenusage"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="nfctoken",
+            options={
+                "permissions": [
+                    ("auth_token", "Can authenticate a token"),
+                    ("auth_token_name", "Can see name during authentication"),
+                    ("auth_token_email", "Can see email during authentication"),
+                    ("auth_token_groups", "Can see groups during authentication"),
+                    ("export_tokens", "Can export all tokens"),
+                    ("self_configure_token", "Can configure own NFC Token"),
+                    ("view_metrics", "Can view NFC token metrics"),
+                ],
+                "verbose_name": "NFC Token",
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.9 on 2026-10-18 12:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0015_nfctoken_view_metrics"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="nfctokenlog",
+            index=models.Index(
+                fields=["user", "-timestamp", "-id"], name="nfctokenlog_user_timestamp"
+            ),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# SQLite FTS5 index over NFCTokenLog, used by the admin search. Other
+# databases keep the default search.
+
+from django.db import migrations
+
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE nfctokens_nfctokenlog_fts USING fts5(
+        uid, location, name, username, token_description,
+        content='nfctokens_nfctokenlog', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER nfctokens_nfctokenlog_fts_insert
+    AFTER INSERT ON nfctokens_nfctokenlog BEGIN
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (rowid, uid, location, name, username, token_description)
+        VALUES
+            (new.id, new.uid, new.location, new.name, new.username,
+             new.token_description);
+    END
+    """,
+    """
+    CREATE TRIGGER nfctokens_nfctokenlog_fts_delete
+    AFTER DELETE ON nfctokens_nfctokenlog BEGIN
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (nfctokens_nfctokenlog_fts, rowid, uid, location, name, username,
+             token_description)
+        VALUES
+            ('delete', old.id, old.uid, old.location, old.name, old.username,
+             old.token_description);
+    END
+    """,
+    """
+    CREATE TRIGGER nfctokens_nfctokenlog_fts_update
+    AFTER UPDATE OF uid, location, name, username, token_description
+    ON nfctokens_nfctokenlog BEGIN
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (nfctokens_nfctokenlog_fts, rowid, uid, location, name, username,
+             token_description)
+        VALUES
+            ('delete', old.id, old.uid, old.location, old.name, old.username,
+             old.token_description);
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (rowid, uid, location, name, username, token_description)
+        VALUES
+            (new.id, new.uid, new.location, new.name, new.username,
+             new.token_description);
+    END
+    """,
+    "INSERT INTO nfctokens_nfctokenlog_fts(nfctokens_nfctokenlog_fts) VALUES('rebuild')",
+]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS nfctokens_nfctokenlog_fts_insert",
+    "DROP TRIGGER IF EXISTS nfctokens_nfctokenlog_fts_delete",
+    "DROP TRIGGER IF EXISTS nfctokens_nfctokenlog_fts_update",
+    "DROP TABLE IF EXISTS nfctokens_nfctokenlog_fts",
+]
+
+
+def run(statements):
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return execute
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0016_nfctokenlog_user_timestamp"),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), reverse_code=run(DROP)),
+    ]
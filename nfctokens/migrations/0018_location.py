@@ -0,0 +1,231 @@
+# Replaces the free-text location columns with references to a Location
+# table. The FTS index from 0017 is recreated without the location column,
+# locations are searched through their own table.
+
+from importlib import import_module
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+fts_0017 = import_module("nfctokens.migrations.0017_nfctokenlog_fts")
+
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS nfctokens_nfctokenlog_fts_insert",
+    "DROP TRIGGER IF EXISTS nfctokens_nfctokenlog_fts_delete",
+    "DROP TRIGGER IF EXISTS nfctokens_nfctokenlog_fts_update",
+    "DROP TABLE IF EXISTS nfctokens_nfctokenlog_fts",
+]
+
+FTS_CREATE = [
+    """
+    CREATE VIRTUAL TABLE nfctokens_nfctokenlog_fts USING fts5(
+        uid, name, username, token_description,
+        content='nfctokens_nfctokenlog', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER nfctokens_nfctokenlog_fts_insert
+    AFTER INSERT ON nfctokens_nfctokenlog BEGIN
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (rowid, uid, name, username, token_description)
+        VALUES
+            (new.id, new.uid, new.name, new.username, new.token_description);
+    END
+    """,
+    """
+    CREATE TRIGGER nfctokens_nfctokenlog_fts_delete
+    AFTER DELETE ON nfctokens_nfctokenlog BEGIN
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (nfctokens_nfctokenlog_fts, rowid, uid, name, username,
+             token_description)
+        VALUES
+            ('delete', old.id, old.uid, old.name, old.username,
+             old.token_description);
+    END
+    """,
+    """
+    CREATE TRIGGER nfctokens_nfctokenlog_fts_update
+    AFTER UPDATE OF uid, name, username, token_description
+    ON nfctokens_nfctokenlog BEGIN
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (nfctokens_nfctokenlog_fts, rowid, uid, name, username,
+             token_description)
+        VALUES
+            ('delete', old.id, old.uid, old.name, old.username,
+             old.token_description);
+        INSERT INTO nfctokens_nfctokenlog_fts
+            (rowid, uid, name, username, token_description)
+        VALUES
+            (new.id, new.uid, new.name, new.username, new.token_description);
+    END
+    """,
+    "INSERT INTO nfctokens_nfctokenlog_fts(nfctokens_nfctokenlog_fts) VALUES('rebuild')",
+]
+
+# (model, old column, new field)
+LOCATION_FIELDS = [
+    ("nfctoken", "last_location_name", "last_location"),
+    ("nfctokenlog", "location_name", "location"),
+    ("nfctokenusage", "location_name", "location"),
+]
+
+
+def run_sqlite(statements):
+    def execute(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return execute
+
+
+def register_locations(apps, schema_editor):
+    Location = apps.get_model("nfctokens", "Location")
+    names = set()
+    for model_name, old, new in LOCATION_FIELDS:
+        model = apps.get_model("nfctokens", model_name)
+        names.update(model.objects.values_list(old, flat=True).distinct())
+    names -= {None, ""}
+    Location.objects.bulk_create(
+        (Location(name=name) for name in sorted(names)), batch_size=1000
+    )
+    for model_name, old, new in LOCATION_FIELDS:
+        model = apps.get_model("nfctokens", model_name)
+        # one pass over each table, empty locations become NULL
+        model.objects.update(
+            **{
+                new: Subquery(
+                    Location.objects.filter(name=OuterRef(old)).values("id")[:1]
+                )
+            }
+        )
+
+
+def unregister_locations(apps, schema_editor):
+    Location = apps.get_model("nfctokens", "Location")
+    for model_name, old, new in LOCATION_FIELDS:
+        model = apps.get_model("nfctokens", model_name)
+        model.objects.update(
+            **{
+                old: Subquery(
+                    Location.objects.filter(pk=OuterRef(new)).values("name")[:1]
+                )
+            }
+        )
+        if old != "last_location_name":
+            model.objects.filter(**{f"{new}__isnull": True}).update(**{old: ""})
+
+
+def location_field():
+    return models.ForeignKey(
+        blank=True,
+        editable=False,
+        null=True,
+        on_delete=django.db.models.deletion.PROTECT,
+        related_name="+",
+        to="nfctokens.location",
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0017_nfctokenlog_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Location",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(editable=False, max_length=255, unique=True)),
+                (
+                    "first_seen",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, editable=False
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["name"],
+            },
+        ),
+        migrations.RunPython(
+            run_sqlite(FTS_DROP), reverse_code=run_sqlite(fts_0017.CREATE)
+        ),
+        migrations.AlterUniqueTogether(
+            name="nfctokenusage",
+            unique_together=set(),
+        ),
+        migrations.RenameField(
+            model_name="nfctoken",
+            old_name="last_location",
+            new_name="last_location_name",
+        ),
+        migrations.RenameField(
+            model_name="nfctokenlog",
+            old_name="location",
+            new_name="location_name",
+        ),
+        migrations.RenameField(
+            model_name="nfctokenusage",
+            old_name="location",
+            new_name="location_name",
+        ),
+        migrations.AddField(
+            model_name="nfctoken",
+            name="last_location",
+            field=location_field(),
+        ),
+        migrations.AddField(
+            model_name="nfctokenlog",
+            name="location",
+            field=location_field(),
+        ),
+        migrations.AddField(
+            model_name="nfctokenusage",
+            name="location",
+            field=location_field(),
+        ),
+        migrations.RunPython(register_locations, reverse_code=unregister_locations),
+        # nullable in the state only, so that unapplying re-adds the columns
+        # without rebuilding the tables
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name=model_name,
+                    name="location_name",
+                    field=models.CharField(editable=False, max_length=255, null=True),
+                )
+                for model_name in ["nfctokenlog", "nfctokenusage"]
+            ],
+        ),
+        migrations.RemoveField(
+            model_name="nfctoken",
+            name="last_location_name",
+        ),
+        migrations.RemoveField(
+            model_name="nfctokenlog",
+            name="location_name",
+        ),
+        migrations.RemoveField(
+            model_name="nfctokenusage",
+            name="location_name",
+        ),
+        migrations.AlterUniqueTogether(
+            name="nfctokenusage",
+            unique_together={("day", "location", "user", "authorized", "ltype")},
+        ),
+        migrations.RunPython(run_sqlite(FTS_CREATE), reverse_code=run_sqlite(FTS_DROP)),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 6.0.9 on 2026-10-18 13:53
+#
+# The unique_together on NFCTokenUsage never matched rows with a NULL
+# location, user or authorized, so duplicates may already exist. They are
+# merged before the coalescing constraint is added.
+
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Sum
+
+
+def merge_duplicates(apps, schema_editor):
+    NFCTokenUsage = apps.get_model("nfctokens", "NFCTokenUsage")
+    keys = ("day", "location", "user", "authorized", "ltype")
+    duplicates = (
+        NFCTokenUsage.objects.values(*keys)
+        .annotate(
+            rows=Count("id"),
+            total=Sum("count"),
+            first=Min("first_seen"),
+            last=Max("last_seen"),
+        )
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        usage = NFCTokenUsage.objects.filter(**{key: row[key] for key in keys})
+        keep = usage.order_by("pk").first()
+        usage.exclude(pk=keep.pk).delete()
+        usage.update(count=row["total"], first_seen=row["first"], last_seen=row["last"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0018_location"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name="nfctokenusage",
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name="nfctokenusage",
+            constraint=models.UniqueConstraint(
+                models.F("day"),
+                django.db.models.functions.comparison.Coalesce(
+                    "location", models.Value(0)
+                ),
+                django.db.models.functions.comparison.Coalesce("user", models.Value(0)),
+                django.db.models.functions.comparison.Coalesce(
+                    django.db.models.functions.comparison.Cast(
+                        "authorized", models.IntegerField()
+                    ),
+                    models.Value(-1),
+                ),
+                models.F("ltype"),
+                name="nfctokens_nfctokenusage_unique",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Recreates the FTS index from 0018 with the trigram tokenizer, so that the
+# admin search matches the middle of a UID or name as the default search
+# did, not only the start of a word. Needs SQLite 3.34 or later.
+
+from importlib import import_module
+
+from django.db import migrations
+
+fts_0018 = import_module("nfctokens.migrations.0018_location")
+
+UNICODE61 = "content='nfctokens_nfctokenlog', content_rowid='id'"
+TRIGRAM = f"{UNICODE61}, tokenize='trigram'"
+
+FTS_CREATE = [
+    fts_0018.FTS_CREATE[0].replace(UNICODE61, TRIGRAM),
+    *fts_0018.FTS_CREATE[1:],
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("nfctokens", "0019_nfctokenusage_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            fts_0018.run_sqlite(fts_0018.FTS_DROP + FTS_CREATE),
+            reverse_code=fts_0018.run_sqlite(fts_0018.FTS_DROP + fts_0018.FTS_CREATE),
+        ),
+    ]
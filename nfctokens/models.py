@@ -7,6 +7,8 @@ import datetime
 from django.contrib.auth import get_user_model
 from django.core.validators import RegexValidator
 from django.db import models
+from django.db.models import Value
+from django.db.models.functions import Cast, Coalesce
 from django.utils import timezone
 
 
@@ -21,6 +23,19 @@ class RecentTokenManager(models.Manager):
         return super().get_queryset().filter(user__isnull=True, last_seen__gte=t)
 
 
+class Location(models.Model):
+    # Locations as sent by controllers, registered on first sighting and
+    # referenced by id from the logs and usage totals.
+    name = models.CharField(max_length=255, unique=True, editable=False)
+    first_seen = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
 class NFCToken(models.Model):
     user = models.ForeignKey(
         get_user_model(),
@@ -73,8 +88,13 @@ class NFCToken(models.Model):
     enabled = models.BooleanField(default=True)
     last_edit = models.DateTimeField(editable=False, default=timezone.now)
     last_seen = models.DateTimeField(null=True, blank=True, editable=False)
-    last_location = models.CharField(
-        null=True, blank=True, max_length=255, editable=False
+    last_location = models.ForeignKey(
+        Location,
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.PROTECT,
+        related_name="+",
     )
 
     objects = models.Manager()
@@ -90,6 +110,7 @@ class NFCToken(models.Model):
             ("auth_token_groups", "Can see groups during authentication"),
             ("export_tokens", "Can export all tokens"),
             ("self_configure_token", "Can configure own NFC Token"),
+            ("view_metrics", "Can view NFC token metrics"),
         ]
 
     def __str__(self):
@@ -113,7 +134,14 @@ class NFCTokenLog(models.Model):
     token = models.ForeignKey(
         NFCToken, null=True, blank=True, editable=False, on_delete=models.SET_NULL
     )
-    location = models.CharField(max_length=255, editable=False)
+    location = models.ForeignKey(
+        Location,
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.PROTECT,
+        related_name="+",
+    )
     uid = models.CharField(max_length=32, editable=False)
     username = models.CharField(max_length=255, blank=True, editable=False)
     name = models.CharField(max_length=255, blank=True, editable=False)
@@ -125,6 +153,12 @@ class NFCTokenLog(models.Model):
 
     class Meta:
         verbose_name = "NFC Token Log"
+        indexes = [
+            models.Index(fields=["timestamp"], name="nfctokenlog_timestamp"),
+            models.Index(
+                fields=["user", "-timestamp", "-id"], name="nfctokenlog_user_timestamp"
+            ),
+        ]
         permissions = [
             ("self_view_tokenlog", "Can view own NFC Token Log"),
         ]
@@ -136,3 +170,55 @@ class NFCTokenLog(models.Model):
             # we're only allowed to save new objects
             # don't allow changing of existing objects
             return
+
+
+class NFCTokenChange(models.Model):
+    # One row per user whose exported groups/tokens may have changed. The
+    # primary key doubles as the version number of the nfc_tokens export.
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
+    username = models.CharField(max_length=255, editable=False)
+
+    class Meta:
+        verbose_name = "NFC Token Change"
+
+
+class NFCTokenUsage(models.Model):
+    # Daily totals of NFCTokenLog, kept beyond the log retention period.
+    day = models.DateField(editable=False)
+    location = models.ForeignKey(
+        Location,
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.PROTECT,
+        related_name="+",
+    )
+    user = models.ForeignKey(
+        get_user_model(),
+        null=True,
+        blank=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name="nfctokenusage",
+    )
+    authorized = models.BooleanField(editable=False, null=True, blank=True)
+    ltype = models.CharField(max_length=32, editable=False, verbose_name="Type")
+    count = models.PositiveIntegerField(default=0, editable=False)
+    first_seen = models.DateTimeField(editable=False)
+    last_seen = models.DateTimeField(editable=False)
+
+    class Meta:
+        verbose_name = "NFC Token Usage"
+        verbose_name_plural = "NFC Token Usage"
+        constraints = [
+            # NULLs are distinct in a plain unique index, and SQLite has no
+            # NULLS NOT DISTINCT, so the nullable columns are coalesced
+            models.UniqueConstraint(
+                "day",
+                Coalesce("location", Value(0)),
+                Coalesce("user", Value(0)),
+                Coalesce(Cast("authorized", models.IntegerField()), Value(-1)),
+                "ltype",
+                name="nfctokens_nfctokenusage_unique",
+            )
+        ]
@@ -0,0 +1,119 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import export, locations, snapshot
+from .models import Location, NFCToken
+
+
+def is_sighting(update_fields):
+    # routine sighting, nothing that affects authorization
+    return update_fields and set(update_fields) <= {"last_seen", "last_location"}
+
+
+def is_login(update_fields):
+    return update_fields and list(update_fields) == ["last_login"]
+
+
+def users_changed(user_ids):
+    user_ids = set(user_ids)
+    snapshot.users_changed(user_ids)
+    export.record_users(user_ids)
+
+
+@receiver(pre_save, sender=NFCToken)
+def nfctoken_pre_save(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and not is_sighting(update_fields):
+        # the token may be moving from one user to another
+        instance._old_user_id = (
+            NFCToken.objects.filter(pk=instance.pk)
+            .values_list("user", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=NFCToken)
+def nfctoken_post_save(sender, instance, update_fields=None, **kwargs):
+    if is_sighting(update_fields):
+        return
+    snapshot.token_changed(instance.pk)
+    export.record_users([instance.user_id, getattr(instance, "_old_user_id", None)])
+
+
+@receiver(post_delete, sender=NFCToken)
+def nfctoken_post_delete(sender, instance, **kwargs):
+    snapshot.token_changed(instance.pk)
+    export.record_users([instance.user_id])
+
+
+@receiver(post_delete, sender=Location)
+def location_post_delete(sender, instance, **kwargs):
+    locations.locations_changed()
+
+
+@receiver(pre_save, sender=get_user_model())
+def user_pre_save(sender, instance, update_fields=None, **kwargs):
+    if instance.pk and not is_login(update_fields):
+        old = (
+            get_user_model()
+            .objects.filter(pk=instance.pk)
+            .only("username", "email")
+            .first()
+        )
+        if old and export.export_key(old) != export.export_key(instance):
+            # renamed, so the old name drops out of the export
+            export.record_keys([export.export_key(old)])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_post_save(sender, instance, update_fields=None, **kwargs):
+    if is_login(update_fields):
+        return
+    users_changed([instance.pk])
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_post_delete(sender, instance, **kwargs):
+    snapshot.users_changed([instance.pk])
+    export.record_keys([export.export_key(instance)])
+
+
+@receiver(post_save, sender=Group)
+def group_post_save(sender, instance, created=False, **kwargs):
+    if not created:
+        # may have been renamed
+        snapshot.everything_changed()
+        export.record_users(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Group)
+def group_pre_delete(sender, instance, **kwargs):
+    export.record_users(instance.user_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Group)
+def group_post_delete(sender, instance, **kwargs):
+    snapshot.everything_changed()
+
+
+@receiver(m2m_changed, sender=Group.user_set.through)
+def group_membership_changed(sender, instance, action, pk_set, **kwargs):
+    if isinstance(instance, Group):
+        if action == "pre_clear":
+            # post_clear doesn't say who was removed
+            users_changed(instance.user_set.values_list("pk", flat=True))
+        elif action in ["post_add", "post_remove"]:
+            users_changed(pk_set)
+    elif action in ["post_add", "post_remove", "post_clear"]:
+        users_changed([instance.pk])
@@ -0,0 +1,95 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min
+from django.db.models.functions import Greatest, Least, TruncDate
+from django.utils import timezone
+
+from .models import NFCTokenLog, NFCTokenUsage
+
+
+def add_logs(logs):
+    # fold a batch of new NFCTokenLog rows into the daily totals
+    totals = {}
+    for log in logs:
+        key = (
+            timezone.localdate(log.timestamp),
+            log.location_id,
+            log.user_id,
+            log.authorized,
+            log.ltype,
+        )
+        count, first_seen, last_seen = totals.get(
+            key, (0, log.timestamp, log.timestamp)
+        )
+        totals[key] = (
+            count + 1,
+            min(first_seen, log.timestamp),
+            max(last_seen, log.timestamp),
+        )
+
+    for (day, location, user_id, authorized, ltype), (
+        count,
+        first_seen,
+        last_seen,
+    ) in totals.items():
+        key = {
+            "day": day,
+            "location_id": location,
+            "user_id": user_id,
+            "authorized": authorized,
+            "ltype": ltype,
+        }
+        updated = NFCTokenUsage.objects.filter(**key).update(
+            count=F("count") + count,
+            first_seen=Least("first_seen", first_seen),
+            last_seen=Greatest("last_seen", last_seen),
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    NFCTokenUsage.objects.create(
+                        count=count, first_seen=first_seen, last_seen=last_seen, **key
+                    )
+            except IntegrityError:
+                # created by another process in the meantime
+                NFCTokenUsage.objects.filter(**key).update(
+                    count=F("count") + count,
+                    first_seen=Least("first_seen", first_seen),
+                    last_seen=Greatest("last_seen", last_seen),
+                )
+
+
+def rebuild_day(day):
+    # recalculate one day from the logs, for backfilling
+    tzinfo = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time()))
+    end = start + datetime.timedelta(days=1)
+    rows = (
+        NFCTokenLog.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(day=TruncDate("timestamp", tzinfo=tzinfo))
+        .values("day", "location", "user", "authorized", "ltype")
+        .annotate(
+            count=Count("id"), first_seen=Min("timestamp"), last_seen=Max("timestamp")
+        )
+        .order_by()
+    )
+    with transaction.atomic():
+        NFCTokenUsage.objects.filter(day=day).delete()
+        NFCTokenUsage.objects.bulk_create(
+            NFCTokenUsage(
+                day=row["day"],
+                location_id=row["location"],
+                user_id=row["user"],
+                authorized=row["authorized"],
+                ltype=row["ltype"],
+                count=row["count"],
+                first_seen=row["first_seen"],
+                last_seen=row["last_seen"],
+            )
+            for row in rows
+        )
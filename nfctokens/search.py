@@ -0,0 +1,67 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# Search of NFCTokenLog through the FTS5 index created by migration 0020.
+# The index is kept up to date by triggers, so rows deleted by retention
+# leave it too. Only available on SQLite.
+#
+# The index is of trigrams, so a term matches anywhere in a column. Terms
+# shorter than a trigram can't use it and fall back to a scan.
+#
+# Location names live in their own small table and are matched there.
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.text import smart_split, unescape_string_literal
+
+from .models import Location
+
+TABLE = "nfctokens_nfctokenlog_fts"
+COLUMNS = ("uid", "name", "username", "token_description")
+
+
+def available():
+    return connection.vendor == "sqlite"
+
+
+def search_terms(search_term):
+    # words, with quoted phrases kept together
+    terms = []
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        if bit.strip():
+            terms.append(bit)
+    return terms
+
+
+def match_query(term):
+    # the term must appear somewhere in an indexed column
+    escaped = term.replace('"', '""')
+    return f'"{escaped}"'
+
+
+def indexed(term):
+    if len(term) < 3:
+        query = Q()
+        for column in COLUMNS:
+            query |= Q(**{f"{column}__icontains": term})
+        return query
+    return Q(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s",
+            [match_query(term)],
+        )
+    )
+
+
+def matches(search_term):
+    # every term must match the indexed columns or the location name
+    query = Q()
+    for term in search_terms(search_term):
+        query &= indexed(term) | Q(
+            location__in=Location.objects.filter(name__icontains=term).values("id")
+        )
+    return query
@@ -0,0 +1,152 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import functools
+from typing import NamedTuple
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from hackdb import metrics
+from hackdb.writebehind import WriteBehindBuffer
+
+from . import locations, rollups
+from .models import NFCToken, NFCTokenLog
+
+WRITE_SECONDS = metrics.Histogram(
+    "nfctokens_sighting_write_seconds",
+    "Time spent writing a batch of sightings, by stage",
+    ["stage"],
+)
+WRITTEN = metrics.Counter(
+    "nfctokens_sightings_written", "Sightings written to the token log"
+)
+
+
+class Sighting(NamedTuple):
+    uid: str
+    location: str
+    authorized: bool
+    ltype: str
+    timestamp: object
+
+
+@functools.lru_cache(maxsize=4096)
+def uid_is_valid(uid):
+    try:
+        NFCToken._meta.get_field("uid").run_validators(uid)
+    except ValidationError:
+        return False
+    return True
+
+
+class SightingBuffer(WriteBehindBuffer):
+    interval_setting = "NFCTOKENS_SIGHTING_FLUSH_INTERVAL"
+    size_setting = "NFCTOKENS_SIGHTING_FLUSH_SIZE"
+
+    def write(self, sightings):
+        stages = metrics.Stages()
+        with transaction.atomic():
+            with stages("locations"):
+                location_ids = locations.cache.resolve(
+                    {sighting.location for sighting in sightings}
+                )
+            with stages("tokens"):
+                tokens = self.update_tokens(sightings, location_ids)
+            with stages("logs"):
+                logs = NFCTokenLog.objects.bulk_create(
+                    self.make_log(
+                        sighting,
+                        tokens.get(sighting.uid),
+                        location_ids.get(sighting.location),
+                    )
+                    for sighting in sightings
+                )
+            with stages("rollups"):
+                rollups.add_logs(logs)
+        stages.observe(WRITE_SECONDS)
+        WRITTEN.inc(len(logs))
+
+    def update_tokens(self, sightings, location_ids):
+        latest = {}
+        for sighting in sightings:
+            if not uid_is_valid(sighting.uid):
+                # don't record sightings against tokens that can't be used
+                continue
+            if (
+                sighting.uid not in latest
+                or sighting.timestamp > latest[sighting.uid].timestamp
+            ):
+                latest[sighting.uid] = sighting
+
+        tokens = NFCToken.objects.select_related("user").in_bulk(
+            latest.keys(), field_name="uid"
+        )
+        for uid, sighting in latest.items():
+            if uid in tokens:
+                NFCToken.objects.filter(
+                    Q(last_seen__isnull=True) | Q(last_seen__lt=sighting.timestamp),
+                    pk=tokens[uid].pk,
+                ).update(
+                    last_seen=sighting.timestamp,
+                    last_location_id=location_ids.get(sighting.location),
+                )
+            else:
+                # remember new tokens so that they can be claimed by a user
+                token = NFCToken(
+                    uid=uid,
+                    last_seen=sighting.timestamp,
+                    last_location_id=location_ids.get(sighting.location),
+                )
+                try:
+                    with transaction.atomic():
+                        token.save()
+                except IntegrityError:
+                    token = NFCToken.objects.get(uid=uid)
+                tokens[uid] = token
+        return tokens
+
+    def make_log(self, sighting, token, location_id):
+        tokenlog = NFCTokenLog(
+            ltype=sighting.ltype,
+            timestamp=sighting.timestamp,
+            uid=sighting.uid,
+            location_id=location_id,
+            authorized=sighting.authorized,
+        )
+        if token:
+            tokenlog.token = token
+            tokenlog.token_description = token.description
+            if token.user:
+                tokenlog.user = token.user
+                tokenlog.username = token.user.username
+                tokenlog.name = token.user.get_full_name()
+        return tokenlog
+
+
+buffer = SightingBuffer()
+
+
+def make_sighting(uid, location, authorized, type_="unknown", timestamp=None):
+    if timestamp is None:
+        timestamp = timezone.now()
+    return Sighting(uid, (location or "")[:255], authorized, type_, timestamp)
+
+
+def record(uid, location, authorized, type_="unknown", timestamp=None):
+    buffer.add(make_sighting(uid, location, authorized, type_, timestamp))
+
+
+def record_many(sightings):
+    buffer.add(*sightings)
+
+
+async def arecord(uid, location, authorized, type_="unknown", timestamp=None):
+    await buffer.aadd(make_sighting(uid, location, authorized, type_, timestamp))
+
+
+async def arecord_many(sightings):
+    await buffer.aadd(*sightings)
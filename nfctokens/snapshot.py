@@ -0,0 +1,197 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+# In-memory snapshot of everything nfc_token_auth needs to make a decision,
+# so that the door path doesn't have to query tokens, users or groups.
+#
+# Each worker process holds its own copy. Changes made in this process are
+# patched in directly by the receivers; a shared version number (see
+# hackdb.versions) tells other processes that their copy is out of date and
+# needs to be rebuilt on the next lookup. Without a shared cache that check
+# reads the Version table, once per request for all the caches together. As
+# a safety net the snapshot is also rebuilt once it is older than
+# NFCTOKENS_SNAPSHOT_MAX_AGE seconds.
+
+import threading
+import time
+from typing import NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from hackdb import groupmasks
+from hackdb.versions import aget_version, bump_version, get_version
+
+from .models import NFCToken
+
+VERSION_KEY = "nfctokens.snapshot_version"
+
+
+class TokenEntry(NamedTuple):
+    token_id: int
+    uid: str
+    enabled: bool
+    user_id: int | None
+    is_active: bool
+    username: str
+    name: str
+    email: str
+    group_mask: int
+    groups: tuple
+
+
+def get_shared_version():
+    return get_version(VERSION_KEY)
+
+
+def bump_shared_version():
+    return bump_version(VERSION_KEY)
+
+
+def load_entries(**filters):
+    entries = {}
+    groupmasks.index.refresh()
+    tokens = list(NFCToken.objects.filter(**filters).select_related("user"))
+    if filters:
+        masks = groupmasks.user_masks({token.user_id for token in tokens})
+    else:
+        masks = groupmasks.user_masks()
+    for token in tokens:
+        user = token.user
+        if user:
+            mask = masks.get(user.pk, 0)
+            entries[token.uid] = TokenEntry(
+                token_id=token.pk,
+                uid=token.uid,
+                enabled=token.enabled,
+                user_id=user.pk,
+                is_active=user.is_active,
+                username=user.username,
+                name=user.get_full_name(),
+                email=user.email,
+                group_mask=mask,
+                groups=tuple(groupmasks.index.group_list(mask)),
+            )
+        else:
+            entries[token.uid] = TokenEntry(
+                token_id=token.pk,
+                uid=token.uid,
+                enabled=token.enabled,
+                user_id=None,
+                is_active=False,
+                username="",
+                name="",
+                email="",
+                group_mask=0,
+                groups=(),
+            )
+    return entries
+
+
+class AuthSnapshot:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = None
+        self.version = None
+        self.loaded = 0
+
+    def is_stale(self):
+        if self.version != get_shared_version():
+            return True
+        max_age = settings.NFCTOKENS_SNAPSHOT_MAX_AGE
+        if max_age and time.monotonic() - self.loaded > max_age:
+            return True
+        return False
+
+    async def ais_stale(self):
+        if self.version != await aget_version(VERSION_KEY):
+            return True
+        max_age = settings.NFCTOKENS_SNAPSHOT_MAX_AGE
+        if max_age and time.monotonic() - self.loaded > max_age:
+            return True
+        return False
+
+    async def aentries(self):
+        # {uid: TokenEntry}, rebuilt first if it is out of date
+        entries = self.entries
+        if entries is None or await self.ais_stale():
+            entries = await sync_to_async(self.rebuild)()
+        return entries
+
+    async def aget(self, uid):
+        return (await self.aentries()).get(uid)
+
+    def get(self, uid):
+        entries = self.entries
+        if entries is None or self.is_stale():
+            entries = self.rebuild()
+        return entries.get(uid)
+
+    def rebuild(self):
+        with self.lock:
+            version = get_shared_version()
+            groupmasks.index.refresh(force=True)
+            self.entries = load_entries()
+            self.version = version
+            self.loaded = time.monotonic()
+            return self.entries
+
+    def invalidate(self):
+        # force every process (including this one) to rebuild
+        bump_shared_version()
+
+    def update_users(self, user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        with self.lock:
+            version = bump_shared_version()
+            if self.entries is None:
+                return
+            if self.version is None or version != self.version + 1:
+                # somebody else has changed something too, rebuild next time
+                self.entries = None
+                return
+            entries = {
+                uid: entry
+                for uid, entry in self.entries.items()
+                if entry.user_id not in user_ids
+            }
+            entries.update(load_entries(user__in=user_ids))
+            self.entries = entries
+            self.version = version
+
+    def update_token(self, token_id):
+        with self.lock:
+            version = bump_shared_version()
+            if self.entries is None:
+                return
+            if self.version is None or version != self.version + 1:
+                self.entries = None
+                return
+            entries = {
+                uid: entry
+                for uid, entry in self.entries.items()
+                if entry.token_id != token_id
+            }
+            entries.update(load_entries(pk=token_id))
+            self.entries = entries
+            self.version = version
+
+
+snapshot = AuthSnapshot()
+
+
+def users_changed(user_ids):
+    user_ids = set(user_ids)
+    transaction.on_commit(lambda: snapshot.update_users(user_ids))
+
+
+def token_changed(token_id):
+    transaction.on_commit(lambda: snapshot.update_token(token_id))
+
+
+def everything_changed():
+    transaction.on_commit(snapshot.invalidate)
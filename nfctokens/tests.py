@@ -0,0 +1,674 @@
+# SPDX-FileCopyrightText: 2026 Tim Hawes <me@timhawes.com>
+#
+# SPDX-License-Identifier: MIT
+
+import csv
+import datetime
+import io
+import json
+import tempfile
+import time
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.management import call_command
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apikeys.models import APIKey
+
+from . import views
+from .models import NFCToken, NFCTokenLog, NFCTokenUsage
+from .bundle import read_bundle
+from .locations import location_id
+from .sightings import Sighting, SightingBuffer
+from .snapshot import snapshot
+
+
+@override_settings(APIKEYS_USAGE_FLUSH_INTERVAL=0, NFCTOKENS_SIGHTING_FLUSH_INTERVAL=0)
+class NFCTokenAuthTestCase(TestCase):
+    def setUp(self):
+        snapshot.invalidate()
+        self.members = Group.objects.create(name="members")
+        self.banned = Group.objects.create(name="banned")
+        self.user = get_user_model().objects.create(
+            username="alice", first_name="Alice", email="alice@example.com"
+        )
+        self.members.user_set.add(self.user)
+        self.token = NFCToken.objects.create(user=self.user, uid="01234567")
+        self.apikey = APIKey.objects.create(description="door")
+        self.apikey.permissions.add(
+            Permission.objects.get(codename="auth_token"),
+            Permission.objects.get(codename="auth_token_groups"),
+        )
+
+    def auth(self, uid, **kwargs):
+        response = self.client.post(
+            "/api/1/nfc_token_auth",
+            json.dumps({"uid": uid, "location": "door", **kwargs}),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+        )
+        return response.json()
+
+    def test_authorized(self):
+        reply = self.auth("01234567", groups=["members"])
+        self.assertTrue(reply["authorized"])
+        self.assertEqual(reply["username"], "alice")
+        self.assertEqual(reply["groups"], ["members"])
+        self.assertEqual(NFCTokenLog.objects.filter(authorized=True).count(), 1)
+
+    def test_metrics(self):
+        before = views.AUTH_RESULTS.get(location="door", reason="In excluded group(s)")
+        self.auth("01234567", exclude_groups=["banned", "members"])
+        self.assertEqual(
+            views.AUTH_RESULTS.get(location="door", reason="In excluded group(s)"),
+            before + 1,
+        )
+
+        response = self.client.get(
+            "/nfctokens/api/metrics", HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}"
+        )
+        self.assertEqual(response.status_code, 403)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apikey.permissions.add(Permission.objects.get(codename="view_metrics"))
+        response = self.client.get(
+            "/nfctokens/api/metrics", HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}"
+        )
+        self.assertContains(
+            response,
+            'nfctokens_auth_seconds_count{location="door",stage="lookup"}',
+        )
+        self.assertContains(response, 'reason="In excluded group(s)"')
+
+    @override_settings(NFCTOKENS_METRICS_LOCATIONS=["door"])
+    def test_metrics_locations(self):
+        before = views.AUTH_RESULTS.get(location="other", reason="Authorized")
+        for i in range(5):
+            self.auth("01234567", location=f"door {i}")
+        self.assertEqual(
+            views.AUTH_RESULTS.get(location="other", reason="Authorized"), before + 5
+        )
+        locations = {key[0] for key in views.AUTH_RESULTS.values}
+        self.assertNotIn("door 0", locations)
+
+    def test_batch(self):
+        tapped = int(time.time()) - 3600
+        response = self.client.post(
+            "/nfctokens/api/nfc_token_auth_batch",
+            json.dumps(
+                [
+                    {"uid": "01234567", "location": "door", "timestamp": tapped},
+                    {"uid": "01234567", "groups": ["banned"]},
+                    {"uid": "08123456"},
+                    {"location": "door"},
+                    "01234567",
+                ]
+            ),
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+        )
+        replies = response.json()
+        self.assertEqual(
+            [reply["authorized"] for reply in replies],
+            [True, False, False, False, False],
+        )
+        self.assertEqual(replies[1]["reason"], "Not in required group(s)")
+        self.assertEqual(replies[2]["reason"], "Random UID not allowed")
+        self.assertEqual(replies[3]["reason"], "Invalid tap")
+        self.assertEqual(replies[4]["reason"], "Invalid tap")
+        self.assertEqual(NFCTokenLog.objects.count(), 2)
+        self.assertTrue(
+            NFCTokenLog.objects.filter(
+                timestamp=datetime.datetime.fromtimestamp(tapped, datetime.timezone.utc)
+            ).exists()
+        )
+
+    def test_batch_queries(self):
+        def post(count):
+            return self.client.post(
+                "/nfctokens/api/nfc_token_auth_batch",
+                json.dumps([{"uid": "01234567", "location": "door"}] * count),
+                content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+            )
+
+        post(1)
+        with CaptureQueriesContext(connection) as queries:
+            post(2)
+        self.assertEqual(
+            len([query for query in queries if "hackdb_version" in query["sql"]]), 1
+        )
+        # the decisions are made from memory, only the writes are left
+        with self.assertNumQueries(len(queries)):
+            post(10)
+
+    def test_tap_timestamp(self):
+        now = timezone.now()
+        for value in [None, True, 0, "nonsense", "2999-01-01T00:00:00Z"]:
+            with self.subTest(value=value):
+                self.assertGreaterEqual(views.parse_tap_timestamp(value), now)
+        tapped = now - datetime.timedelta(hours=1)
+        self.assertEqual(views.parse_tap_timestamp(tapped.isoformat()), tapped)
+
+    def test_not_found(self):
+        reply = self.auth("89abcdef")
+        self.assertEqual(reply["reason"], "Token not found")
+        self.assertTrue(NFCToken.unassigned_objects.filter(uid="89abcdef").exists())
+
+    def test_decision_reads_only_version(self):
+        self.auth("01234567")
+        entry = snapshot.get("01234567")
+        # the version check, the local-memory cache isn't shared
+        with self.assertNumQueries(1):
+            self.assertEqual(snapshot.get("01234567"), entry)
+
+    def test_one_version_query(self):
+        self.auth("01234567")
+        with CaptureQueriesContext(connection) as queries:
+            self.auth("01234567")
+        # API key cache, snapshot and group index share one read
+        self.assertEqual(
+            len([query for query in queries if "hackdb_version" in query["sql"]]), 1
+        )
+
+    def test_snapshot_follows_changes(self):
+        self.auth("01234567")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banned.user_set.add(self.user)
+        reply = self.auth("01234567", exclude_groups=["banned"])
+        self.assertEqual(reply["reason"], "In excluded group(s)")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.token.enabled = False
+            self.token.save()
+        reply = self.auth("01234567")
+        self.assertEqual(reply["reason"], "Token not associated or enabled")
+
+    def test_stale_version_rebuilds(self):
+        self.auth("01234567")
+        # a change made by another worker only bumps the shared version
+        NFCToken.objects.filter(pk=self.token.pk).update(enabled=False)
+        snapshot.invalidate()
+        reply = self.auth("01234567")
+        self.assertEqual(reply["reason"], "Token not associated or enabled")
+
+
+class SightingBufferTestCase(TestCase):
+    def test_coalesce(self):
+        token = NFCToken.objects.create(uid="01234567")
+        now = timezone.now()
+        earlier = now - datetime.timedelta(minutes=1)
+        SightingBuffer().write(
+            [
+                Sighting("01234567", "door", False, "auth", now),
+                Sighting("01234567", "workshop", False, "auth", earlier),
+                Sighting("08123456", "door", False, "auth", now),
+                Sighting("89abcdef", "door", False, "auth", now),
+            ]
+        )
+        token.refresh_from_db()
+        self.assertEqual(token.last_seen, now)
+        self.assertEqual(token.last_location.name, "door")
+        self.assertEqual(NFCTokenLog.objects.count(), 4)
+        # random UIDs are logged but not remembered
+        self.assertFalse(NFCToken.objects.filter(uid="08123456").exists())
+        self.assertTrue(NFCToken.objects.filter(uid="89abcdef").exists())
+
+    def test_usage(self):
+        now = timezone.now()
+        buffer = SightingBuffer()
+        buffer.write([Sighting("01234567", "door", False, "auth", now)] * 2)
+        buffer.write([Sighting("01234567", "door", False, "auth", now)])
+        usage = NFCTokenUsage.objects.get()
+        self.assertEqual(usage.count, 3)
+        self.assertEqual(usage.day, timezone.localdate(now))
+
+        NFCTokenUsage.objects.all().delete()
+        call_command("nfctokens_usage_backfill")
+        self.assertEqual(NFCTokenUsage.objects.get().count, 3)
+
+    def test_usage_null_keys(self):
+        now = timezone.now()
+        usage = {
+            "day": timezone.localdate(now),
+            "ltype": "auth",
+            "count": 1,
+            "first_seen": now,
+            "last_seen": now,
+        }
+        NFCTokenUsage.objects.create(**usage)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            NFCTokenUsage.objects.create(**usage)
+
+    def test_backfill_deployment_day(self):
+        now = timezone.now()
+        # logged before the rollups were deployed, so never counted
+        NFCTokenLog.objects.create(timestamp=now, uid="01234567", ltype="auth")
+        SightingBuffer().write([Sighting("01234567", "door", False, "auth", now)])
+        call_command("nfctokens_usage_backfill")
+        self.assertEqual(
+            NFCTokenUsage.objects.aggregate(total=Sum("count"))["total"], 2
+        )
+
+    def test_backfill_expired_day(self):
+        now = timezone.now()
+        timestamp = now - datetime.timedelta(
+            days=settings.NFCTOKENS_LOG_RETENTION_DAYS, hours=1
+        )
+        NFCTokenLog.objects.create(timestamp=timestamp, uid="01234567", ltype="auth")
+        NFCTokenUsage.objects.create(
+            day=timezone.localdate(timestamp),
+            ltype="auth",
+            count=5,
+            first_seen=timestamp,
+            last_seen=timestamp,
+        )
+        call_command("nfctokens_usage_backfill", overwrite=True)
+        self.assertEqual(NFCTokenUsage.objects.get().count, 5)
+
+
+@override_settings(APIKEYS_USAGE_FLUSH_INTERVAL=0)
+class NFCTokenExportTestCase(TestCase):
+    def setUp(self):
+        self.members = Group.objects.create(name="members")
+        self.apikey = APIKey.objects.create(description="door")
+        self.apikey.permissions.add(Permission.objects.get(codename="export_tokens"))
+
+    def add_user(self, username, uid):
+        with self.captureOnCommitCallbacks(execute=True):
+            user = get_user_model().objects.create(username=username)
+            self.members.user_set.add(user)
+            NFCToken.objects.create(user=user, uid=uid)
+        return user
+
+    def export(self, **params):
+        return self.client.get(
+            "/api/1/nfc_tokens",
+            params,
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+        )
+
+    def test_delta(self):
+        alice = self.add_user("alice", "01234567")
+        self.add_user("bob", "89abcdef")
+
+        response = self.export()
+        self.assertEqual(set(response.json().keys()), {"alice", "bob"})
+        version = int(response["X-NFC-Tokens-Version"])
+
+        data = self.export(since=version).json()
+        self.assertEqual(data["users"], {})
+        self.assertFalse(data["full"])
+
+        self.add_user("carol", "0123456789abcd")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members.user_set.remove(alice)
+        data = self.export(since=version).json()
+        self.assertEqual(list(data["users"].keys()), ["carol"])
+        self.assertEqual(data["deleted"], ["alice"])
+        self.assertGreater(data["version"], version)
+
+    def test_unknown_version(self):
+        self.add_user("alice", "01234567")
+        data = self.export(since=1000).json()
+        self.assertTrue(data["full"])
+        self.assertEqual(list(data["users"].keys()), ["alice"])
+
+    def test_bundle(self):
+        self.add_user("alice", "01234567")
+        self.add_user("bob", "0123456789abcdef012345")
+        self.add_user("carol", "0123456789abcd")
+        response = self.client.get(
+            "/nfctokens/api/nfc_tokens_bundle",
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+        )
+        generation, tokens = read_bundle(response.content)
+        self.assertEqual(generation, int(response["X-NFC-Tokens-Version"]))
+        self.assertEqual(
+            tokens, {"01234567": ["members"], "0123456789abcd": ["members"]}
+        )
+
+        response = self.client.get(
+            "/nfctokens/api/nfc_tokens_bundle",
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+            HTTP_IF_NONE_MATCH=response["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def read_events(self, data=None, headers=None):
+        async def read():
+            response = await self.async_client.get(
+                "/nfctokens/api/nfc_token_events",
+                data,
+                headers={
+                    "Authorization": f"Bearer {self.apikey.key}",
+                    **(headers or {}),
+                },
+            )
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        return async_to_sync(read)().decode()
+
+    @override_settings(NFCTOKENS_EVENTS_MAX_AGE=0)
+    def test_events(self):
+        alice = self.add_user("alice", "01234567")
+        version = int(self.export()["X-NFC-Tokens-Version"])
+        self.add_user("bob", "89abcdef")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.members.user_set.remove(alice)
+
+        events = [
+            dict(line.split(": ", 1) for line in event.splitlines())
+            for event in self.read_events(
+                headers={"Last-Event-ID": str(version)}
+            ).split("\n\n")
+            if event.startswith("id:")
+        ]
+        self.assertEqual([event["event"] for event in events], ["user", "delete"])
+        self.assertEqual(
+            json.loads(events[0]["data"]),
+            {"user": "bob", "groups": ["members"], "tokens": ["89abcdef"]},
+        )
+        self.assertEqual(json.loads(events[1]["data"]), {"user": "alice"})
+        self.assertGreater(int(events[1]["id"]), version)
+
+        self.assertIn("event: resync", self.read_events(data={"since": 1000}))
+
+    def test_events_without_asgi(self):
+        response = self.client.get(
+            "/nfctokens/api/nfc_token_events",
+            HTTP_AUTHORIZATION=f"Bearer {self.apikey.key}",
+        )
+        self.assertEqual(response.status_code, 501)
+
+
+@override_settings(NFCTOKENS_LOG_PAGE_SIZE=2)
+class NFCTokenLogViewTestCase(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create(username="alice")
+        self.user.user_permissions.add(
+            Permission.objects.get(codename="self_view_tokenlog")
+        )
+        self.client.force_login(self.user)
+        now = timezone.now()
+        NFCTokenLog.objects.bulk_create(
+            NFCTokenLog(
+                timestamp=now - datetime.timedelta(days=days),
+                user=self.user,
+                uid="01234567",
+                location_id=location_id(location),
+            )
+            for days, location in [(0, "a"), (1, "b"), (1, "a"), (2, "a"), (3, "b")]
+        )
+
+    def pages(self, **params):
+        pages = []
+        while True:
+            response = self.client.get("/nfctokens/logs", params)
+            pages.append([log.pk for log in response.context["logs"]])
+            if not response.context["older"]:
+                return pages
+            params = QueryDict(response.context["older"]).dict()
+
+    def test_pages(self):
+        expected = list(
+            NFCTokenLog.objects.order_by("-timestamp", "-id").values_list(
+                "pk", flat=True
+            )
+        )
+        pages = self.pages()
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), expected)
+
+    def test_filter(self):
+        pages = self.pages(location="a")
+        self.assertEqual([len(page) for page in pages], [2, 1])
+        self.assertEqual(
+            set(sum(pages, [])),
+            set(
+                NFCTokenLog.objects.filter(location__name="a").values_list(
+                    "pk", flat=True
+                )
+            ),
+        )
+
+
+class NFCTokenLogSearchTestCase(TestCase):
+    def setUp(self):
+        admin = get_user_model().objects.create(username="admin", is_superuser=True)
+        admin.is_staff = True
+        admin.save()
+        self.client.force_login(admin)
+        now = timezone.now()
+        NFCTokenLog.objects.bulk_create(
+            [
+                NFCTokenLog(
+                    timestamp=now,
+                    uid="0123456789abcd",
+                    location_id=location_id("front-door"),
+                ),
+                NFCTokenLog(
+                    timestamp=now,
+                    uid="89abcdef",
+                    location_id=location_id("workshop"),
+                    name="Alice",
+                ),
+                NFCTokenLog(
+                    timestamp=now, uid="01234567", location_id=location_id("front gate")
+                ),
+            ]
+        )
+
+    def search(self, q):
+        response = self.client.get("/admin/nfctokens/nfctokenlog/", {"q": q})
+        return sorted(log.uid for log in response.context["cl"].result_list)
+
+    def test_search(self):
+        self.assertEqual(self.search("front"), ["01234567", "0123456789abcd"])
+        self.assertEqual(self.search("01234567"), ["01234567", "0123456789abcd"])
+        self.assertEqual(self.search("alice"), ["89abcdef"])
+        self.assertEqual(self.search("front-door"), ["0123456789abcd"])
+        self.assertEqual(self.search("front 0123456789"), ["0123456789abcd"])
+
+    def test_search_substring(self):
+        self.assertEqual(self.search("456789ab"), ["0123456789abcd"])
+        self.assertEqual(self.search("lic"), ["89abcdef"])
+        self.assertEqual(self.search("CD"), ["0123456789abcd", "89abcdef"])
+        self.assertEqual(self.search("ef"), ["89abcdef"])
+
+    def test_changelist_queries(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get("/admin/nfctokens/nfctokenlog/")
+            return len(queries)
+
+        before = count()
+        user = get_user_model().objects.create(username="alice")
+        token = NFCToken.objects.create(user=user, uid="0123456789abcdef")
+        NFCTokenLog.objects.bulk_create(
+            NFCTokenLog(
+                timestamp=timezone.now(),
+                uid=token.uid,
+                token=token,
+                user=user,
+                location_id=location_id(f"door {i}"),
+            )
+            for i in range(5)
+        )
+        self.assertEqual(count(), before)
+
+    def test_expired_rows_leave_the_index(self):
+        NFCTokenLog.objects.filter(uid="89abcdef").delete()
+        self.assertEqual(self.search("alice"), [])
+
+
+class NFCTokenExpireTestCase(TestCase):
+    def test_batches(self):
+        now = timezone.now()
+        NFCTokenLog.objects.bulk_create(
+            NFCTokenLog(timestamp=now - datetime.timedelta(days=days), uid="01234567")
+            for days in [100, 1, 100, 100, 100, 2, 100]
+        )
+        out = io.StringIO()
+        call_command("nfctokens_expire", batch_size=2, pause=0, verbosity=2, stdout=out)
+        self.assertEqual(NFCTokenLog.objects.count(), 2)
+        self.assertIn("deleted 5 logs before", out.getvalue())
+
+    def test_archive(self):
+        now = timezone.now()
+        NFCTokenLog.objects.bulk_create(
+            NFCTokenLog(
+                timestamp=now - datetime.timedelta(days=days),
+                uid="01234567",
+                location_id=location_id(location),
+            )
+            for days, location in [(100, "a"), (1, "a"), (100, "b"), (101, "a")]
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            call_command(
+                "nfctokens_expire", batch_size=2, pause=0, archive_dir=directory
+            )
+            call_command(
+                "nfctokens_expire", batch_size=2, pause=0, archive_dir=directory
+            )
+            self.assertEqual(NFCTokenLog.objects.count(), 1)
+
+            def read(**options):
+                output = io.StringIO()
+                call_command(
+                    "nfctokens_archive", archive_dir=directory, stdout=output, **options
+                )
+                return [json.loads(line) for line in output.getvalue().splitlines()]
+
+            self.assertEqual(len(read()), 3)
+            self.assertEqual([log["location"] for log in read(location=["b"])], ["b"])
+            day = timezone.localdate(now - datetime.timedelta(days=101))
+            self.assertEqual(len(read(first_day=day, last_day=day)), 1)
+
+
+class NFCTokenReportTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.alice = get_user_model().objects.create(
+            username="alice", first_name="Alice"
+        )
+        get_user_model().objects.create(username="bob")
+        for uid, enabled, age in [
+            # just inside the 30 day window
+            ("00000001", True, datetime.timedelta(days=30, minutes=-5)),
+            # just outside it
+            ("00000002", True, datetime.timedelta(days=30, minutes=5)),
+            ("00000003", True, datetime.timedelta(days=366)),
+            ("00000004", False, datetime.timedelta(days=1)),
+        ]:
+            token = NFCToken.objects.create(user=self.alice, uid=uid, enabled=enabled)
+            NFCToken.objects.filter(pk=token.pk).update(last_seen=now - age)
+
+    def report(self, *args):
+        stdout = io.StringIO()
+        call_command("nfctokens_report", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_windows(self):
+        rows = [
+            json.loads(line) for line in self.report("--format", "json").splitlines()
+        ]
+        self.assertEqual(
+            rows,
+            [
+                {
+                    "username": "alice",
+                    "name": "Alice",
+                    "tokens": 4,
+                    "enabled": 3,
+                    "1_year": 2,
+                    "90_days": 2,
+                    "30_days": 1,
+                },
+                {
+                    "username": "bob",
+                    "name": "",
+                    "tokens": 0,
+                    "enabled": 0,
+                    "1_year": 0,
+                    "90_days": 0,
+                    "30_days": 0,
+                },
+            ],
+        )
+
+    def test_csv(self):
+        rows = list(
+            csv.reader(
+                io.StringIO(
+                    self.report(
+                        "--format",
+                        "csv",
+                        "--window",
+                        "7",
+                        "--sort",
+                        "Tokens",
+                        "--reverse",
+                    )
+                )
+            )
+        )
+        self.assertEqual(
+            rows,
+            [
+                ["Username", "Name", "Tokens", "Enabled", "7-days"],
+                ["alice", "Alice", "4", "3", "0"],
+                ["bob", "", "0", "0", "0"],
+            ],
+        )
+
+    def test_table(self):
+        lines = self.report().splitlines()
+        self.assertEqual(
+            lines[0].split(),
+            ["Username", "Name", "Tokens", "Enabled", "1-year", "90-days", "30-days"],
+        )
+        self.assertEqual(lines[2].split(), ["alice", "Alice", "4", "3", "2", "2", "1"])
+
+    def test_usage(self):
+        today = timezone.localdate()
+        now = timezone.now()
+        for day, count in [(today, 3), (today - datetime.timedelta(days=6), 2)]:
+            NFCTokenUsage.objects.create(
+                day=day,
+                location_id=location_id("door"),
+                user=self.alice,
+                authorized=True,
+                ltype="auth",
+                count=count,
+                first_seen=now,
+                last_seen=now,
+            )
+        NFCTokenUsage.objects.create(
+            day=today - datetime.timedelta(days=7),
+            location_id=location_id("door"),
+            user=self.alice,
+            authorized=False,
+            ltype="auth",
+            count=5,
+            first_seen=now,
+            last_seen=now,
+        )
+        rows = [
+            json.loads(line)
+            for line in self.report("--usage", "--format", "json").splitlines()
+        ]
+        self.assertEqual(
+            [row["day"] for row in rows],
+            [str(today), str(today - datetime.timedelta(days=6))],
+        )
+        self.assertEqual([row["taps"] for row in rows], [3, 2])
+        self.assertEqual(rows[0]["location"], "door")
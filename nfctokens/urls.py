@@ -37,7 +37,23 @@ urlpatterns = [
     ),
     path("logs", views.mytokenlogs, name="nfctokens_mytokenlogs"),
     path("api/nfc_tokens", views.nfc_tokens, name="nfctokens_api_nfc_tokens"),
+    path(
+        "api/nfc_tokens_bundle",
+        views.nfc_tokens_bundle,
+        name="nfctokens_api_nfc_tokens_bundle",
+    ),
+    path(
+        "api/nfc_token_events",
+        views.nfc_token_events,
+        name="nfctokens_api_nfc_token_events",
+    ),
+    path("api/metrics", views.nfc_token_metrics, name="nfctokens_api_metrics"),
     path(
         "api/nfc_token_auth", views.nfc_token_auth, name="nfctokens_api_nfc_token_auth"
     ),
+    path(
+        "api/nfc_token_auth_batch",
+        views.nfc_token_auth_batch,
+        name="nfctokens_api_nfc_token_auth_batch",
+    ),
 ]
@@ -2,25 +2,53 @@
 #
 # SPDX-License-Identifier: MIT
 
+import datetime
 import json
 
 from django.conf import settings
 from django.contrib import messages
-from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import (
     login_required,
     permission_required,
 )
-from django.core.exceptions import ValidationError
-from django.forms import ModelForm
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.forms import CharField, DateField, DateInput, Form, ModelForm
 from django.forms.widgets import TextInput
-from django.http import HttpResponseRedirect, JsonResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.views.decorators.cache import never_cache
-from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from hackdb import groupmasks, metrics
+
+from . import bundle, events, export, sightings
+from .models import NFCToken
+from .snapshot import snapshot
 
-from .models import NFCToken, NFCTokenLog
+AUTH_SECONDS = metrics.Histogram(
+    "nfctokens_auth_seconds",
+    "Time spent in nfc_token_auth, by location and stage",
+    ["location", "stage"],
+)
+AUTH_RESULTS = metrics.Counter(
+    "nfctokens_auth",
+    "Token authorization decisions, by location and reason",
+    ["location", "reason"],
+)
+LOCATION_LABELS = metrics.LabelValues()
+EXPORT_SECONDS = metrics.Histogram(
+    "nfctokens_export_seconds",
+    "Time spent building the nfc_tokens export, by kind and stage",
+    ["kind", "stage"],
+)
 
 
 def too_many_enabled_tokens(user):
@@ -55,6 +83,37 @@ class TokenEditForm(ModelForm):
             return self.cleaned_data["uid"]
 
 
+class TokenLogFilterForm(Form):
+    location = CharField(required=False)
+    date_from = DateField(
+        required=False, label="From", widget=DateInput(attrs={"type": "date"})
+    )
+    date_to = DateField(
+        required=False, label="To", widget=DateInput(attrs={"type": "date"})
+    )
+
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def log_cursor(log):
+    # "<microseconds since epoch>.<id>" of the last row on a page
+    microseconds = (log.timestamp - EPOCH) // datetime.timedelta(microseconds=1)
+    return f"{microseconds}.{log.pk}"
+
+
+def parse_log_cursor(value):
+    try:
+        microseconds, pk = value.split(".")
+        return EPOCH + datetime.timedelta(microseconds=int(microseconds)), int(pk)
+    except (ValueError, OverflowError):
+        return None
+
+
+def start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time()))
+
+
 @login_required
 def mytokens(request):
     context = {
@@ -125,7 +184,7 @@ def mytokens_claim(request):
     if too_many_enabled_tokens(request.user):
         messages.add_message(request, messages.ERROR, "Too many enabled tokens.")
         return HttpResponseRedirect(reverse("nfctokens_mytokens"))
-    context = {"tokens": NFCToken.recent_objects.all()}
+    context = {"tokens": NFCToken.recent_objects.select_related("last_location")}
     return render(request, "nfctokens/mytokens_claim.html", context)
 
 
@@ -173,142 +232,343 @@ def mytokens_disable(request, uid):
 @login_required
 @permission_required("nfctokens.self_view_tokenlog", raise_exception=True)
 def mytokenlogs(request):
+    # newest first, a page at a time using the (user, timestamp, id) index
+    logs = request.user.nfctokenlogs.select_related("location").order_by(
+        "-timestamp", "-id"
+    )
+
+    form = TokenLogFilterForm(request.GET)
+    if form.is_valid():
+        if form.cleaned_data["location"]:
+            logs = logs.filter(location__name=form.cleaned_data["location"])
+        if form.cleaned_data["date_from"]:
+            logs = logs.filter(
+                timestamp__gte=start_of_day(form.cleaned_data["date_from"])
+            )
+        if form.cleaned_data["date_to"]:
+            logs = logs.filter(
+                timestamp__lt=start_of_day(
+                    form.cleaned_data["date_to"] + datetime.timedelta(days=1)
+                )
+            )
+
+    cursor = parse_log_cursor(request.GET.get("before", ""))
+    if cursor:
+        timestamp, pk = cursor
+        logs = logs.filter(
+            Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+        )
+
+    page_size = settings.NFCTOKENS_LOG_PAGE_SIZE
+    page = list(logs[: page_size + 1])
+    older = None
+    if len(page) > page_size:
+        page = page[:page_size]
+        params = request.GET.copy()
+        params["before"] = log_cursor(page[-1])
+        older = params.urlencode()
+    newest = None
+    if cursor:
+        params = request.GET.copy()
+        del params["before"]
+        newest = params.urlencode()
+
     context = {
-        "tokens": request.user.nfctokenlogs.all().order_by("-timestamp"),
+        "form": form,
+        "logs": page,
+        "older": older,
+        "newest": newest,
     }
     return render(request, "nfctokens/mytokenlogs.html", context)
 
 
-def get_groups(user):
-    return sorted(group.name for group in user.groups.all())
+RANDOM_UID_REPLY = {
+    "found": False,
+    "authorized": False,
+    "reason": "Random UID not allowed",
+}
 
+INVALID_TAP_REPLY = {
+    "found": False,
+    "authorized": False,
+    "reason": "Invalid tap",
+}
 
-def token_sighting(token, location, authorized, type_="unknown", timestamp=None):
-    if timestamp is None:
-        timestamp = timezone.now()
 
-    uid = token.uid
+async def token_sighting(uid, location, authorized, type_="unknown", timestamp=None):
+    # written in the background by sightings.buffer
+    await sightings.arecord(uid, location, authorized, type_=type_, timestamp=timestamp)
 
-    try:
-        token.last_seen = timestamp
-        token.last_location = location
-        token.full_clean()
-        token.save()
-    except ValidationError:
-        token = None
-
-    tokenlog = NFCTokenLog()
-    tokenlog.ltype = type_
-    tokenlog.timestamp = timestamp
-    tokenlog.uid = uid
-    tokenlog.location = location or ""
-    tokenlog.authorized = authorized
-    if token:
-        tokenlog.token = token
-        tokenlog.token_description = token.description
-        if token.user:
-            tokenlog.user = token.user
-            tokenlog.username = token.user.username
-            tokenlog.name = token.user.get_full_name()
-    tokenlog.full_clean()
-    tokenlog.save()
+
+@require_GET
+@permission_required("nfctokens.export_tokens", raise_exception=True)
+async def nfc_tokens(request):
+    stages = metrics.Stages()
+    if "since" in request.GET:
+        try:
+            since = int(request.GET["since"])
+        except ValueError:
+            return JsonResponse({"error": "Invalid version"}, status=400)
+        with stages("query"):
+            version, full, users, deleted = await export.aexport_since(since)
+        with stages("encode"):
+            response = JsonResponse(
+                {"version": version, "full": full, "users": users, "deleted": deleted}
+            )
+        kind = "delta"
+    else:
+        with stages("query"):
+            version = await export.acurrent_version()
+            data = await export.aexport_all()
+        with stages("encode"):
+            response = JsonResponse(data)
+        kind = "full"
+    stages.observe(EXPORT_SECONDS, kind=kind)
+    response["X-NFC-Tokens-Version"] = version
+    return response
 
 
 @require_GET
 @permission_required("nfctokens.export_tokens", raise_exception=True)
-def nfc_tokens(request):
-    data = {}
-    for user in get_user_model().objects.all().prefetch_related("groups", "nfctokens"):
-        if not user.is_active:
-            continue
-        username = user.username or user.email
-        groups = get_groups(user)
-        tokens = []
-        for token in user.nfctokens.filter(enabled=True):
-            tokens.append(token.uid)
-        if len(groups) > 0 and len(tokens) > 0:
-            data[username] = {
-                "groups": groups,
-                "tokens": sorted(tokens),
-            }
-    return JsonResponse(data)
+async def nfc_token_events(request):
+    if not isinstance(request, ASGIRequest):
+        # under WSGI the stream would be buffered and hold a worker thread
+        return JsonResponse({"error": "Requires an ASGI server"}, status=501)
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return JsonResponse({"error": "Invalid version"}, status=400)
+    response = StreamingHttpResponse(
+        events.stream(since), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@require_GET
+@permission_required("nfctokens.view_metrics", raise_exception=True)
+def nfc_token_metrics(request):
+    return HttpResponse(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def export_etag(request):
+    return str(export.current_version())
+
+
+@require_GET
+@permission_required("nfctokens.export_tokens", raise_exception=True)
+@condition(etag_func=export_etag)
+def nfc_tokens_bundle(request):
+    generation, data = bundle.get_bundle()
+    response = HttpResponse(data, content_type="application/octet-stream")
+    response["X-NFC-Tokens-Version"] = generation
+    return response
+
+
+def is_random_uid(uid):
+    return len(uid) == 8 and uid.startswith("08")
+
+
+def is_group_list(value):
+    if value is None or isinstance(value, str):
+        return True
+    return isinstance(value, list) and all(isinstance(name, str) for name in value)
+
+
+def is_valid_tap(item):
+    return (
+        isinstance(item, dict)
+        and isinstance(item.get("uid"), str)
+        and isinstance(item.get("location", ""), (str, type(None)))
+        and is_group_list(item.get("groups"))
+        and is_group_list(item.get("exclude_groups"))
+    )
+
+
+def parse_tap_timestamp(value):
+    # controllers may send ISO 8601 or seconds since the epoch, anything
+    # unreadable, in the future or older than the log retention is replaced
+    # by the current time
+    now = timezone.now()
+    if value is None or isinstance(value, bool):
+        return now
+    try:
+        if isinstance(value, (int, float)):
+            timestamp = datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+        else:
+            timestamp = parse_datetime(value)
+    except (ValueError, OverflowError):
+        return now
+    if timestamp is None:
+        return now
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp, datetime.timezone.utc)
+    retention = settings.NFCTOKENS_LOG_RETENTION_DAYS
+    if retention and timestamp < now - datetime.timedelta(days=retention):
+        return now
+    return min(timestamp, now)
+
+
+async def current_entries(stages):
+    # bring the snapshot and group index up to date, after which decisions
+    # are made from memory
+    with stages("lookup"):
+        entries = await snapshot.aentries()
+    with stages("groups"):
+        await groupmasks.index.arefresh()
+    return entries
+
+
+async def authorize_token(request, uid, required_groups, exclude_groups, stages=None):
+    stages = stages or metrics.Stages()
+    entries = await current_entries(stages)
+    return await decide(
+        request, entries.get(uid), required_groups, exclude_groups, stages
+    )
+
+
+async def decide(request, entry, required_groups, exclude_groups, stages):
+    if entry is None:
+        return {"found": False, "authorized": False, "reason": "Token not found"}
+
+    if not (entry.enabled and entry.user_id and entry.is_active):
+        return {
+            "found": False,
+            "authorized": False,
+            "reason": "Token not associated or enabled",
+        }
+
+    with stages("groups"):
+        excluded = exclude_groups and entry.group_mask & groupmasks.index.mask(
+            exclude_groups
+        )
+        required = not required_groups or entry.group_mask & groupmasks.index.mask(
+            required_groups
+        )
+
+    if excluded:
+        return {
+            "found": True,
+            "authorized": False,
+            "reason": "In excluded group(s)",
+        }
+
+    if not required:
+        return {
+            "found": True,
+            "authorized": False,
+            "reason": "Not in required group(s)",
+        }
+
+    reply = {
+        "found": True,
+        "authorized": True,
+        "username": entry.username,
+    }
+    with stages("details"):
+        user = await request.auser()
+        if await user.ahas_perm("nfctokens.auth_token_name"):
+            reply["name"] = entry.name
+        if await user.ahas_perm("nfctokens.auth_token_email"):
+            reply["email"] = entry.email
+        if await user.ahas_perm("nfctokens.auth_token_groups"):
+            reply["groups"] = list(entry.groups)
+    return reply
+
+
+def location_label(location):
+    # locations come from the controllers, so only a bounded set of them
+    # are used as label values
+    return LOCATION_LABELS.get(
+        location,
+        settings.NFCTOKENS_METRICS_LOCATIONS,
+        settings.NFCTOKENS_METRICS_MAX_LOCATIONS,
+    )
+
+
+def count_result(location, reply):
+    reason = "Authorized" if reply["authorized"] else reply.get("reason", "")
+    AUTH_RESULTS.inc(location=location_label(location), reason=reason)
 
 
 @never_cache
 @require_POST
 @permission_required("nfctokens.auth_token", raise_exception=True)
-def nfc_token_auth(request):
+async def nfc_token_auth(request):
     data = json.loads(request.body.decode())
     uid = data["uid"].strip().lower()
     location = data.get("location")
     required_groups = data.get("groups")
     exclude_groups = data.get("exclude_groups", [])
 
-    if len(uid) == 8 and uid.startswith("08"):
-        return JsonResponse(
-            {"found": False, "authorized": False, "reason": "Random UID not allowed"}
-        )
+    if is_random_uid(uid):
+        count_result(location, RANDOM_UID_REPLY)
+        return JsonResponse(RANDOM_UID_REPLY)
 
-    # lookup the token
-    try:
-        token = NFCToken.objects.get(uid=uid)
-    except NFCToken.DoesNotExist:
-        token = NFCToken(uid=uid)
-        token_sighting(token, location, False, type_="auth")
-        return JsonResponse(
-            {"found": False, "authorized": False, "reason": "Token not found"}
+    stages = metrics.Stages()
+    with stages("total"):
+        reply = await authorize_token(
+            request, uid, required_groups, exclude_groups, stages
         )
+        with stages("sighting"):
+            await token_sighting(uid, location, reply["authorized"], type_="auth")
+    stages.observe(AUTH_SECONDS, location=location_label(location))
+    count_result(location, reply)
+    return JsonResponse(reply)
 
-    if not (token.enabled and token.user and token.user.is_active):
-        token_sighting(token, location, False, type_="auth")
-        return JsonResponse(
-            {
-                "found": False,
-                "authorized": False,
-                "reason": "Token not associated or enabled",
-            }
-        )
 
-    if exclude_groups:
-        for group in get_groups(token.user):
-            if group in exclude_groups:
-                token_sighting(token, location, False, type_="auth")
-                return JsonResponse(
-                    {
-                        "found": True,
-                        "authorized": False,
-                        "reason": "In excluded group(s)",
-                    }
-                )
-
-    user_groups = get_groups(token.user)
-    matched_groups = []
-    if required_groups:
-        found = False
-        for group in user_groups:
-            if group in required_groups:
-                matched_groups.append(group)
-                found = True
-        if not found:
-            token_sighting(token, location, False, type_="auth")
-            return JsonResponse(
-                {
-                    "found": True,
-                    "authorized": False,
-                    "reason": "Not in required group(s)",
-                }
+@never_cache
+@require_POST
+@permission_required("nfctokens.auth_token", raise_exception=True)
+async def nfc_token_auth_batch(request):
+    # replay of taps queued by a controller while it was offline
+    try:
+        data = json.loads(request.body.decode())
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(data, list):
+        return JsonResponse({"error": "Expected a list of taps"}, status=400)
+    if len(data) > settings.NFCTOKENS_AUTH_BATCH_LIMIT:
+        return JsonResponse({"error": "Too many taps"}, status=400)
+
+    stages = metrics.Stages()
+    entries = await current_entries(stages)
+    replies = []
+    batch = []
+    for item in data:
+        if not is_valid_tap(item):
+            # answered rather than failing the batch, so that a controller
+            # doesn't replay it forever
+            replies.append(INVALID_TAP_REPLY)
+            continue
+        uid = item["uid"].strip().lower()
+        if is_random_uid(uid):
+            count_result(item.get("location"), RANDOM_UID_REPLY)
+            replies.append(RANDOM_UID_REPLY)
+            continue
+        reply = await decide(
+            request,
+            entries.get(uid),
+            item.get("groups"),
+            item.get("exclude_groups", []),
+            stages,
+        )
+        count_result(item.get("location"), reply)
+        replies.append(reply)
+        batch.append(
+            sightings.make_sighting(
+                uid,
+                item.get("location"),
+                reply["authorized"],
+                type_="auth",
+                timestamp=parse_tap_timestamp(item.get("timestamp")),
             )
-
-    reply = {
-        "found": True,
-        "authorized": True,
-        "username": token.user.username,
-    }
-    if request.user.has_perm("nfctokens.auth_token_name"):
-        reply["name"] = token.user.get_full_name()
-    if request.user.has_perm("nfctokens.auth_token_email"):
-        reply["email"] = token.user.email
-    if request.user.has_perm("nfctokens.auth_token_groups"):
-        reply["groups"] = user_groups
-    token_sighting(token, location, True, type_="auth")
-    return JsonResponse(reply)
+        )
+    # queued together so that they are written in one transaction
+    await sightings.arecord_many(batch)
+    return JsonResponse(replies, safe=False)